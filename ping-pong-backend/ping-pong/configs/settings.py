@@ -37,9 +37,10 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
+    # Before staticfiles, so home's runserver command takes precedence
+    "home",
     "django.contrib.staticfiles",
     "rest_framework",
-    "home",
     "ping",
     "pong",
     "corsheaders",
@@ -80,6 +81,15 @@ WSGI_APPLICATION = "configs.wsgi.application"
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = [
+    "X-Grid-M",
+    "X-Grid-N",
+    "X-Colored-Pixels",
+    "X-Tile-Level",
+    "X-Tile-Levels",
+    "X-Tile-X",
+    "X-Tile-Y",
+]
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -124,6 +134,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "EXCEPTION_HANDLER": "home.exceptions.exception_handler",
 }
 
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
@@ -0,0 +1,43 @@
+"""
+Django settings for the ping and pong hop services.
+
+Hop workers only serve /api/ping/ and /api/pong/: they run one strategy per
+request and send the progress updates to PROGRESS_URL. They load the routing and
+strategy code of `home`, `ping` and `pong` and nothing else: none of the admin,
+auth, sessions, messages or static files apps, no CORS or CSRF middleware, and
+none of the grid, session, event or raster modules of the main service. That
+keeps per-request overhead, memory per worker and cold-start time down when
+scaling replicas.
+
+Select it with DJANGO_SETTINGS_MODULE=configs.settings_hop.
+"""
+
+from configs.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    # Settings (HomeConfig), strategies, transport and the runserver command
+    "home",
+    "rest_framework",
+    "ping",
+    "pong",
+]
+
+# Hops are posted service to service: no browser, cookies or CORS preflight
+MIDDLEWARE = []
+
+ROOT_URLCONF = "configs.urls_hop"
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+# No auth app: requests are anonymous and DRF must not import the auth models
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+    "UNAUTHENTICATED_USER": None,
+    "EXCEPTION_HANDLER": "home.exceptions.exception_handler",
+}
+
+USE_I18N = False
@@ -0,0 +1,7 @@
+from django.urls import include, path
+
+# Routes of the ping and pong hop services (see configs.settings_hop)
+urlpatterns = [
+    path("api/", include("ping.urls")),
+    path("api/", include("pong.urls")),
+]
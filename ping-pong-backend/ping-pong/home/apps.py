@@ -1,5 +1,6 @@
 from django.apps import AppConfig
 import os
+import tempfile
 
 
 class HomeConfig(AppConfig):
@@ -7,3 +8,78 @@ class HomeConfig(AppConfig):
     name = "home"
 
     MAIN_URL = os.getenv("MAIN_URL", "http://localhost:8000/api")
+    # API roots hops are sent to: the ping and pong services, and the main
+    # service's progress updates. All default to MAIN_URL, the single-server
+    # setup; set them when the services run apart (see docker-compose.yml)
+    PING_URL = os.getenv("PING_URL", MAIN_URL)
+    PONG_URL = os.getenv("PONG_URL", MAIN_URL)
+    PROGRESS_URL = os.getenv("PROGRESS_URL", MAIN_URL)
+    # "dense" (1 byte per pixel), "bitmap" (1 bit per pixel), "memmap" (bitmap + colors on disk)
+    # or "interval" (merged filled ranges, for sequential fills of very large grids)
+    GRID_BACKEND = os.getenv("GRID_BACKEND", "dense")
+    # State file name of the memmap backend: a session is stored as
+    # <root>-<session id><ext>, and the existing ones are resumed at startup
+    GRID_STATE_PATH = os.getenv("GRID_STATE_PATH", os.path.join(tempfile.gettempdir(), "ping-pong-grid.mmap"))
+    # Generation sessions kept at once; idle ones are dropped after
+    # SESSION_TTL seconds, and the least recently used ones are evicted past
+    # MAX_SESSIONS or SESSION_MEMORY_BUDGET bytes
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 16))
+    SESSION_TTL = float(os.getenv("SESSION_TTL", 3600))
+    SESSION_MEMORY_BUDGET = int(os.getenv("SESSION_MEMORY_BUDGET", 1 << 30))
+    # Largest grid filled in random order with random unique colors by
+    # SmallImageStrategy; larger ones are filled sequentially. Hops carry only
+    # their new pixels, but the main service keeps a color per pixel and /ui/
+    # lists every pixel for these grids, so memory and /ui/ bodies grow with it
+    RANDOM_MAX_PIXELS = int(os.getenv("RANDOM_MAX_PIXELS", 784))
+    # Largest grid served by LargeImageStrategy; raise together with GRID_BACKEND=bitmap
+    MAX_PIXELS = int(os.getenv("MAX_PIXELS", 20_000_000))
+    # Shared keep-alive client for hops between services (see home.http_client)
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 16))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3.05))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+    # Read timeout of the progress callbacks to status/update_pixel/
+    HTTP_UPDATE_TIMEOUT = float(os.getenv("HTTP_UPDATE_TIMEOUT", 2))
+    # Encoding of hop and update payloads: "binary" (home.utils.wire) or "json";
+    # receivers accept both, selected by Content-Type
+    HOP_WIRE_FORMAT = os.getenv("HOP_WIRE_FORMAT", "binary")
+    # "auto": hops and updates to SELF_URL, the address this server listens on
+    # (any loopback host name, same port), are handed to the view logic
+    # directly; "loopback" does so for any host whose path resolves here,
+    # "http" always sends HTTP requests
+    HOP_TRANSPORT = os.getenv("HOP_TRANSPORT", "auto")
+    SELF_URL = os.getenv("SELF_URL", "http://localhost:8000")
+    # "async": hops are forwarded by a background worker pool and the view
+    # returns at once; "sync": each hop waits for the rest of the chain
+    HOP_DISPATCH = os.getenv("HOP_DISPATCH", "async")
+    HOP_WORKERS = int(os.getenv("HOP_WORKERS", 4))
+    # Progress updates are sent in merged batches of up to PROGRESS_BATCH_SIZE
+    # ranges/pixels, at most PROGRESS_FLUSH_INTERVAL seconds after the first one
+    PROGRESS_BATCH_SIZE = int(os.getenv("PROGRESS_BATCH_SIZE", 512))
+    PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", 0.05))
+    # Past PROGRESS_MAX_BUFFER buffered updates, hops wait for the reporter to
+    # send some; a batch failing PROGRESS_MAX_RETRIES times in a row ends the
+    # reporting of its run
+    PROGRESS_MAX_BUFFER = int(os.getenv("PROGRESS_MAX_BUFFER", 100_000))
+    PROGRESS_MAX_RETRIES = int(os.getenv("PROGRESS_MAX_RETRIES", 8))
+    # Pixels per hop are planned to make each hop take about HOP_TARGET_SECONDS,
+    # from measured hop latency and per-pixel cost, within [BATCH_MIN, BATCH_MAX]
+    HOP_TARGET_SECONDS = float(os.getenv("HOP_TARGET_SECONDS", 0.05))
+    BATCH_MIN = int(os.getenv("BATCH_MIN", 1))
+    BATCH_MAX = int(os.getenv("BATCH_MAX", 2_000_000))
+    # Number of ping/pong chains generating disjoint parts of the grid in
+    # parallel, unless /generate/ asks for another count
+    GENERATION_LANES = int(os.getenv("GENERATION_LANES", 1))
+    # Largest full /ui/ answer, in pixels: past it the image is sent in pages
+    # of that many pixels, walked with `start`, and clients are pointed at
+    # /ui/raster/, which sends the whole image in a few bytes per pixel
+    UI_PAGE_PIXELS = int(os.getenv("UI_PAGE_PIXELS", 65_536))
+    # Memory for rendered /ui/ bodies, one per session at most, least recently used evicted first
+    UI_CACHE_BYTES = int(os.getenv("UI_CACHE_BYTES", 64 << 20))
+    # Largest /ui/tile/ answer, in pixels of the requested zoom level
+    MAX_TILE_PIXELS = int(os.getenv("MAX_TILE_PIXELS", 1 << 20))
+
+    def ready(self):
+        if self.GRID_BACKEND == "memmap":
+            from home import sessions
+
+            sessions.get_store().restore()
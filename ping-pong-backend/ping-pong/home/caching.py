@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+
+
+class RenderedBodyCache:
+    """
+    Rendered response bodies by (session id, version), bounded in bytes.
+
+    Only the latest version of a session is kept: storing a body drops the
+    session's older ones, which no request can match again. Past
+    `max_bytes`, the least recently used bodies are evicted, and a body
+    larger than the whole budget is not cached at all.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, version) -> bytes | None:
+        with self._lock:
+            entry = self._bodies.get(session_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._bodies.move_to_end(session_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, session_id: str, version, body: bytes) -> None:
+        with self._lock:
+            self._remove(session_id)
+            if len(body) > self.max_bytes:
+                return
+            self._bodies[session_id] = (version, body)
+            self.nbytes += len(body)
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._bodies)))
+
+    def forget(self, session_id: str) -> None:
+        """
+        Drop the body of a session, e.g. once it is evicted.
+        """
+        with self._lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id: str) -> None:
+        entry = self._bodies.pop(session_id, None)
+        if entry is not None:
+            self.nbytes -= len(entry[1])
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+
+_UI_CACHE = None
+_UI_CACHE_LOCK = threading.Lock()
+
+
+def get_ui_cache() -> RenderedBodyCache:
+    """
+    Get the cache of full /ui/ bodies, created from the home app settings on first use.
+    """
+    global _UI_CACHE
+    with _UI_CACHE_LOCK:
+        if _UI_CACHE is None:
+            _UI_CACHE = RenderedBodyCache(apps.get_app_config('home').UI_CACHE_BYTES)
+        return _UI_CACHE
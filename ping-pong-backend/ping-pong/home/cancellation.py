@@ -0,0 +1,97 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import requests
+from django.apps import apps
+
+from home import transport
+
+logger = logging.getLogger(__name__)
+
+# Cancelled run tokens remembered at once; the oldest are forgotten first
+MAX_CANCELLED_TOKENS = 4096
+
+
+class CancelledTokens:
+    """
+    Run tokens of cancelled generations, as seen by this process.
+
+    Every `generate` call starts a run with a fresh token, carried by its
+    hops and progress updates. The main service cancels a token when the
+    run is replaced, cancelled or its session evicted. Hop services share
+    this registry when they run in the same process; otherwise the main
+    service tells them through `notify_hop_services`, and they also learn
+    about a cancelled token from the 409 answer to its progress updates.
+    Work for a cancelled token is dropped on sight and counted in `dropped`.
+
+    Callbacks passed to `subscribe` are called with every newly cancelled token.
+    """
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.dropped = 0
+        self._tokens = OrderedDict()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[str], None]) -> None:
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def cancel(self, token: str | None) -> None:
+        if token is None:
+            return
+        with self._lock:
+            new = token not in self._tokens
+            self._tokens[token] = True
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.max_tokens:
+                self._tokens.popitem(last=False)
+            listeners = list(self._listeners) if new else []
+        for listener in listeners:
+            listener(token)
+
+    def is_cancelled(self, token: str | None) -> bool:
+        return token is not None and token in self._tokens
+
+    def drop(self, token: str | None) -> bool:
+        """
+        Whether work for `token` should be dropped; counts it if so.
+        """
+        if not self.is_cancelled(token):
+            return False
+        with self._lock:
+            self.dropped += 1
+        return True
+
+
+CANCELLED = CancelledTokens(MAX_CANCELLED_TOKENS)
+
+
+def notify_hop_services(token: str) -> None:
+    """
+    Tell the ping and pong services in other processes that a run was
+    cancelled, from a background thread, so its chains stop at their next
+    hop rather than once its progress updates are refused.
+    """
+    config = apps.get_app_config('home')
+    urls = [
+        url for url in dict.fromkeys([f"{config.PING_URL}/ping/cancel/", f"{config.PONG_URL}/pong/cancel/"])
+        # Services in this process share the registry already
+        if transport.get_transport().handler(url) is None
+    ]
+    if urls:
+        threading.Thread(
+            target=_notify, args=(urls, token, config.HTTP_UPDATE_TIMEOUT), name="cancel-notify", daemon=True
+        ).start()
+
+
+def _notify(urls: list[str], token: str, timeout: float) -> None:
+    for url in urls:
+        try:
+            transport.send(url, {"token": token}, timeout=timeout).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not notify %s of cancelled run %s: %s", url, token, e)
@@ -0,0 +1,120 @@
+import numpy as np
+
+from home.state import Session
+from home.utils.colors import sequential_colors
+from home.utils.raster import build_raster
+
+
+def _colored_pixels(session: Session) -> tuple[np.ndarray, np.ndarray]:
+    image = {}
+    if session.random_colors:
+        # Small grids: read under the lock, so every colored pixel is in `indices`
+        with session.lock:
+            indices = session.grid.filled_indices()
+            image = dict(session.image)
+    else:
+        indices = session.grid.filled_indices()
+
+    # The color is the 24-bit linear index, split by shift/mask; small grids
+    # override it with the random colors of the pixels added one by one
+    colors = sequential_colors(indices)
+    if image:
+        keys = np.fromiter(image.keys(), dtype=np.int64, count=len(image))
+        colors[np.searchsorted(indices, keys)] = np.array(list(image.values()), dtype=np.uint8).reshape(-1, 3)
+    return indices, colors
+
+
+def colored_pixels(session: Session) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Get the linear indices and (k, 3) uint8 colors of all colored pixels.
+
+    Results are kept on the session until its next write to the image.
+    """
+    with session.lock:
+        version, cached = session.version, session.colored
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # Built outside the lock: concurrent misses only duplicate work, and a
+    # write made meanwhile bumps the version past the cached one
+    value = _colored_pixels(session)
+    with session.lock:
+        if not session.closed:
+            session.colored = (version, value)
+    return value
+
+
+def rgb_raster(session: Session, channels: int = 4) -> np.ndarray:
+    """
+    Get the (m, n, channels) raster of a session's image.
+    """
+    indices, colors = colored_pixels(session)
+    return build_raster(session.m, session.n, indices, colors, channels)
+
+
+def image_list(session: Session) -> list[dict]:
+    """
+    Get the colored pixels as the frontend's {"x", "y", "color"} dicts.
+    """
+    return _pixel_dicts(session, *colored_pixels(session))
+
+
+def image_page(session: Session, start: int, limit: int) -> tuple[list[dict], int | None]:
+    """
+    Get up to `limit` colored pixels from linear index `start` on, as in
+    `image_list`, and the index of the next one, None past the last.
+
+    Sequential grids read the page from the ledger of filled ranges, so the
+    cost follows the page size rather than the number of colored pixels.
+    """
+    if session.random_colors:
+        indices, colors = colored_pixels(session)
+        position = int(np.searchsorted(indices, start))
+        indices, colors = indices[position:position + limit + 1], colors[position:position + limit + 1]
+    else:
+        with session.lock:
+            ranges = session.ledger.take(start, limit + 1)
+        indices = np.concatenate([np.arange(first, last) for first, last in ranges] or [np.empty(0, dtype=np.int64)])
+        colors = sequential_colors(indices)
+
+    next_index = int(indices[limit]) if len(indices) > limit else None
+    return _pixel_dicts(session, indices[:limit], colors[:limit]), next_index
+
+
+def _pixel_dicts(session: Session, indices: np.ndarray, colors: np.ndarray) -> list[dict]:
+    ys, xs = np.divmod(indices, max(session.n, 1))
+    return [
+        {"x": x, "y": y, "color": color}
+        for x, y, color in zip(xs.tolist(), ys.tolist(), colors.tolist())
+    ]
+
+
+def rgba_window(session: Session, y0: int, y1: int, x0: int = 0, x1: int | None = None) -> np.ndarray:
+    """
+    Get rows [y0, y1), columns [x0, x1) of a session's image as an RGBA raster.
+
+    Large grids are read from the fill mask of the window only, without
+    building the whole image.
+
+    Returns:
+        uint8 array of shape (y1 - y0, x1 - x0, 4)
+    """
+    n = session.n
+    x1 = n if x1 is None else x1
+    if session.random_colors:
+        return rgb_raster(session)[y0:y1, x0:x1]
+
+    indices = (np.arange(y0, y1)[:, None] * n + np.arange(x0, x1)).ravel()
+    filled = np.ones(len(indices), dtype=bool)
+    if x0 == 0 and x1 == n:
+        filled[session.grid.unfilled_indices(y0 * n, y1 * n) - y0 * n] = False
+    else:
+        for row, y in enumerate(range(y0, y1)):
+            start = y * n + x0
+            filled[session.grid.unfilled_indices(start, start + x1 - x0) - start + row * (x1 - x0)] = False
+
+    raster = np.empty((len(indices), 4), dtype=np.uint8)
+    raster[:, :3] = sequential_colors(indices)
+    raster[:, 3] = 255
+    raster[~filled] = 0
+    return raster.reshape(y1 - y0, x1 - x0, 4)
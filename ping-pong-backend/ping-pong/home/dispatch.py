@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.apps import apps
+
+from home import transport
+from home.cancellation import CANCELLED
+from home.image_strategies.planner import get_planner
+
+logger = logging.getLogger(__name__)
+
+
+class HopDispatcher:
+    """
+    Forwards a hop to the next service from a background worker pool.
+
+    A strategy enqueues the next hop and returns its own response at once, so
+    the ping/pong chain no longer nests: each request holds a worker only for
+    one hop, however many hops the image needs. In "sync" mode the hop is
+    posted inline instead, as the chain originally worked. Queued hops of a
+    cancelled run are dropped instead of sent.
+    """
+
+    def __init__(self, mode: str, workers: int):
+        if mode not in ("async", "sync"):
+            raise ValueError(f"Unknown hop dispatch mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def forward(self, url: str, payload: dict) -> None:
+        """
+        Post `payload` to the next service, without waiting for it in async mode.
+        """
+        if self.mode == "sync":
+            transport.send(url, payload)
+            return
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hop")
+            self.pending += 1
+        self._executor.submit(self._post, url, payload)
+
+    def _post(self, url: str, payload: dict) -> None:
+        try:
+            if CANCELLED.drop(payload.get("token")):
+                return
+            started = time.perf_counter()
+            response = transport.send(url, payload)
+            response.raise_for_status()
+            # The next service answers once it queued its own hop: one hop's latency
+            get_planner().observe_hop(time.perf_counter() - started)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Error forwarding hop to %s: %s", url, e)
+        except Exception:
+            # A worker has no caller to raise to: an unexpected error would be lost with the hop
+            logger.exception("Unexpected error forwarding hop to %s", url)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+
+_DISPATCHER = None
+_DISPATCHER_LOCK = threading.Lock()
+
+
+def get_dispatcher() -> HopDispatcher:
+    """
+    Get the shared dispatcher, created from the home app settings on first use.
+    """
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            config = apps.get_app_config('home')
+            _DISPATCHER = HopDispatcher(config.HOP_DISPATCH, config.HOP_WORKERS)
+        return _DISPATCHER
+
+
+def forward(url: str, payload: dict) -> None:
+    """
+    Shortcut for `get_dispatcher().forward(...)`.
+    """
+    get_dispatcher().forward(url, payload)
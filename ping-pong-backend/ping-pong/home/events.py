@@ -0,0 +1,180 @@
+import asyncio
+import json
+import threading
+import time
+
+# A subscriber that falls this far behind gets a single resync event and
+# catches up with /api/ui/?since=<cursor> instead of an unbounded backlog.
+MAX_PENDING_RANGES = 1024
+MAX_PENDING_PIXELS = 4096
+# Minimum delay between two frames; updates arriving meanwhile are merged.
+FRAME_INTERVAL = 0.1
+KEEPALIVE_INTERVAL = 15.0
+
+
+class Subscriber:
+    """
+    Pending, coalesced updates for one stream client.
+
+    Publishers never block on a subscriber: new ranges are merged into the
+    pending frame, which the client's stream drains at its own pace.
+    """
+
+    def __init__(self, generation: str, loop: asyncio.AbstractEventLoop | None = None):
+        self.generation = generation
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop = loop
+        self._async_ready = asyncio.Event() if loop else None
+        self.ranges = []
+        self.pixels = []
+        # Fill sequence number of the oldest pending range
+        self.since = 0
+        # New clients start with a resync from the start of the generation,
+        # which doubles as their initial snapshot
+        self.resync = True
+        self.resync_cursor = f"{generation}:0"
+
+    def push(self, seq: int, ranges: list[tuple[int, int]], pixels: list[dict]) -> None:
+        """
+        Queue ranges logged from fill sequence number `seq` onwards.
+        """
+        with self._lock:
+            if not self.resync:
+                if not self.ranges:
+                    self.since = seq
+                for start, end in ranges:
+                    if self.ranges and self.ranges[-1][1] == start:
+                        self.ranges[-1] = (self.ranges[-1][0], end)
+                    else:
+                        self.ranges.append((start, end))
+                self.pixels.extend(pixels)
+                if len(self.ranges) > MAX_PENDING_RANGES or len(self.pixels) > MAX_PENDING_PIXELS:
+                    # Resume from the oldest dropped range, not from the cursor
+                    # at render time: later updates are dropped until then
+                    self.resync = True
+                    self.resync_cursor = f"{self.generation}:{self.since}"
+                    self.ranges = []
+                    self.pixels = []
+        self._ready.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_ready.set)
+
+    def take(self) -> tuple[list[tuple[int, int]], list[dict], str | None]:
+        """
+        Drain the pending frame; returns (ranges, pixels, resync cursor or None).
+        """
+        with self._lock:
+            frame = (self.ranges, self.pixels, self.resync_cursor if self.resync else None)
+            self.ranges = []
+            self.pixels = []
+            self.resync = False
+        return frame
+
+    def wait(self, timeout: float) -> bool:
+        ready = self._ready.wait(timeout)
+        self._ready.clear()
+        return ready
+
+    async def wait_async(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._async_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._async_ready.clear()
+        self._ready.clear()
+        return True
+
+
+class EventBroadcaster:
+    """
+    Fans the fills of one session out to its stream clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, generation: str, loop: asyncio.AbstractEventLoop | None = None) -> Subscriber:
+        subscriber = Subscriber(generation, loop)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, seq: int, ranges: list[tuple[int, int]], pixels: list[dict] | None = None) -> None:
+        """
+        Send ranges, logged from fill sequence number `seq`, to all subscribers.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(seq, ranges, pixels or [])
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _render_frame(session, subscriber: Subscriber) -> tuple[bytes, bool]:
+    """
+    Drain the subscriber into SSE bytes; returns (frame, done).
+    """
+    if session.closed:
+        return _sse("evicted", {"session": session.id}), True
+    ranges, pixels, resync_cursor = subscriber.take()
+    progress = {**session.progress(), "cursor": session.cursor()}
+    chunks = []
+    if resync_cursor is not None:
+        chunks.append(_sse("resync", {"cursor": resync_cursor}))
+    elif ranges:
+        chunks.append(_sse("pixels", {"ranges": ranges, "image": pixels}))
+    chunks.append(_sse("progress", progress))
+    if progress["done"]:
+        chunks.append(_sse("done", progress))
+    return b"".join(chunks), progress["done"]
+
+
+def stream(session):
+    """
+    Blocking SSE generator for a session, used when served by a WSGI worker thread.
+    """
+    subscriber = session.broadcaster.subscribe(session.generation)
+    try:
+        frame, done = _render_frame(session, subscriber)
+        yield frame
+        while not done:
+            if not subscriber.wait(KEEPALIVE_INTERVAL):
+                yield b": keepalive\n\n"
+                continue
+            time.sleep(FRAME_INTERVAL)
+            frame, done = _render_frame(session, subscriber)
+            yield frame
+    finally:
+        session.broadcaster.unsubscribe(subscriber)
+
+
+async def stream_async(session):
+    """
+    SSE generator for ASGI servers; waiting clients hold no thread.
+    """
+    subscriber = session.broadcaster.subscribe(session.generation, asyncio.get_running_loop())
+    try:
+        frame, done = _render_frame(session, subscriber)
+        yield frame
+        while not done:
+            if not await subscriber.wait_async(KEEPALIVE_INTERVAL):
+                yield b": keepalive\n\n"
+                continue
+            await asyncio.sleep(FRAME_INTERVAL)
+            frame, done = _render_frame(session, subscriber)
+            yield frame
+    finally:
+        session.broadcaster.unsubscribe(subscriber)
@@ -0,0 +1,21 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def exception_handler(exc, context):
+    """
+    DRF exception handler that never renders an error with a binary renderer.
+
+    Errors from endpoints negotiating e.g. image/png, and 406 responses where
+    no renderer was accepted, are sent as application/json instead.
+    """
+    response = drf_exception_handler(exc, context)
+    request = context.get('request')
+    if response is None or request is None:
+        return response
+
+    renderer = getattr(request, 'accepted_renderer', None)
+    if renderer is None or getattr(renderer, 'render_style', 'text') == 'binary':
+        request.accepted_renderer = JSONRenderer()
+        request.accepted_media_type = JSONRenderer.media_type
+    return response
@@ -0,0 +1,89 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class OccupancyGrid(ABC):
+    """
+    Fill mask of an m x n grid addressed by linear index (y * n + x).
+
+    Implementations keep `filled` in step with every write so counting is O(1).
+    `cursor`, `generation` and `seed` are bookkeeping kept alongside the grid so that
+    persistent backends can store them with the data.
+    """
+    name: str
+    persistent = False
+
+    def __init__(self, m: int, n: int):
+        self.m = m
+        self.n = n
+        self.size = m * n
+        self.filled = 0
+        self.cursor = 0
+        self.generation = ""
+        self.seed = 0
+
+    def count(self) -> int:
+        return self.filled
+
+    def is_full(self) -> bool:
+        return self.filled >= self.size
+
+    def _clamp(self, start: int, end: int) -> tuple[int, int]:
+        start = min(max(start, 0), self.size)
+        return start, min(max(end, start), self.size)
+
+    @abstractmethod
+    def set_range(self, start: int, end: int) -> int:
+        """
+        Fill [start, end) and return the number of newly filled pixels.
+        """
+
+    def set(self, index: int) -> bool:
+        return self.set_range(index, index + 1) == 1
+
+    @abstractmethod
+    def test(self, index: int) -> bool:
+        pass
+
+    @abstractmethod
+    def filled_indices(self) -> np.ndarray:
+        """
+        Linear indices of all filled pixels, in increasing order.
+        """
+
+    def filled_ranges(self) -> list[tuple[int, int]]:
+        """
+        Filled pixels as contiguous [start, end) runs of linear indices, in increasing order.
+        """
+        indices = self.filled_indices()
+        if len(indices) == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+        return [(int(run[0]), int(run[-1]) + 1) for run in np.split(indices, breaks)]
+
+    @abstractmethod
+    def unfilled_indices(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """
+        Linear indices of the empty pixels in [start, end), in increasing order.
+        """
+
+    def mask(self) -> np.ndarray:
+        """
+        Dense (m, n) boolean view of the grid, for callers that need one.
+        """
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.filled_indices()] = True
+        return mask.reshape(self.m, self.n)
+
+    def store_colors(self, indices, colors) -> None:
+        """
+        Persist pixel colors; only persistent backends keep them.
+        """
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def nbytes(self) -> int:
+        return 0
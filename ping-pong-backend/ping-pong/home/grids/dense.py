@@ -0,0 +1,39 @@
+import numpy as np
+
+from home.grids.base import OccupancyGrid
+
+
+class DenseGrid(OccupancyGrid):
+    """
+    One uint8 cell per pixel.
+    """
+    name = "dense"
+
+    def __init__(self, m: int, n: int):
+        super().__init__(m, n)
+        self.cells = np.zeros(self.size, dtype=np.uint8)
+
+    def set_range(self, start, end):
+        start, end = self._clamp(start, end)
+        segment = self.cells[start:end]
+        newly_filled = segment.size - int(np.count_nonzero(segment))
+        segment[:] = 1
+        self.filled += newly_filled
+        return newly_filled
+
+    def test(self, index):
+        return bool(self.cells[index])
+
+    def filled_indices(self):
+        return np.flatnonzero(self.cells)
+
+    def unfilled_indices(self, start=0, end=None):
+        start, end = self._clamp(start, self.size if end is None else end)
+        return np.flatnonzero(self.cells[start:end] == 0) + start
+
+    def mask(self):
+        return self.cells.reshape(self.m, self.n).astype(bool)
+
+    @property
+    def nbytes(self):
+        return self.cells.nbytes
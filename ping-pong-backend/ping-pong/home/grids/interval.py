@@ -0,0 +1,67 @@
+from bisect import bisect_left
+
+import numpy as np
+
+from home.grids.base import OccupancyGrid
+from home.utils.intervals import IntervalSet
+
+# Two list slots and two Python ints per stored interval
+INTERVAL_BYTES = 72
+
+
+class IntervalGrid(OccupancyGrid):
+    """
+    Filled pixels as sorted, merged [start, end) intervals of linear indices.
+
+    Memory grows with the number of runs rather than the grid size: a
+    sequential fill is a handful of intervals whatever its length, so very
+    large grids cost next to nothing until they fill sparsely. Lookups are
+    O(log k) for k intervals and enumerating the filled pixels is
+    O(k + filled). A range write is O(k) in the worst case, as it splices
+    sorted lists (see `IntervalSet.add`), but O(1) when it extends the last
+    interval. Random fills fragment the set; use "bitmap" for them.
+    """
+    name = "interval"
+
+    def __init__(self, m: int, n: int):
+        super().__init__(m, n)
+        self.intervals = IntervalSet()
+
+    def set_range(self, start, end):
+        start, end = self._clamp(start, end)
+        newly_filled = sum(gap_end - gap_start for gap_start, gap_end in self.intervals.add(start, end))
+        self.filled += newly_filled
+        return newly_filled
+
+    def test(self, index):
+        return index in self.intervals
+
+    def filled_indices(self):
+        return _aranges(self.intervals)
+
+    def filled_ranges(self):
+        return list(self.intervals)
+
+    def unfilled_indices(self, start=0, end=None):
+        start, end = self._clamp(start, self.size if end is None else end)
+        gaps = []
+        position = bisect_left(self.intervals.ends, start + 1)
+        cursor = start
+        for interval_start, interval_end in zip(self.intervals.starts[position:], self.intervals.ends[position:]):
+            if interval_start >= end:
+                break
+            if interval_start > cursor:
+                gaps.append((cursor, interval_start))
+            cursor = max(cursor, interval_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return _aranges(gaps)
+
+    @property
+    def nbytes(self):
+        return len(self.intervals) * INTERVAL_BYTES
+
+
+def _aranges(ranges) -> np.ndarray:
+    parts = [np.arange(start, end) for start, end in ranges]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+
+from home.grids.bitmap import BitmapGrid
+
+MEMMAP_MAGIC = b"PPMM"
+MEMMAP_VERSION = 1
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u4"),
+    ("m", "<u8"),
+    ("n", "<u8"),
+    ("filled", "<u8"),
+    ("cursor", "<u8"),
+    ("generation", "S16"),
+    ("seed", "<u8"),
+])
+HEADER_SIZE = 64
+
+
+class MemmapGrid(BitmapGrid):
+    """
+    Bitmap grid stored in a memory-mapped file, together with a color array.
+
+    File layout: a 64-byte header (magic, version, m, n, filled, cursor,
+    generation, seed), the packed fill bits, then m * n RGB triplets. Every write
+    goes straight to the mapping, so the state survives a process restart
+    and other processes can read it zero-copy with `MemmapGrid.open`.
+    """
+    name = "memmap"
+    persistent = True
+
+    def __init__(self, m: int, n: int, path: str):
+        """
+        Create the map at `path`, replacing any previous one.
+
+        The file is built under a temporary name and renamed into place, so
+        readers still mapping the old file never see it truncated.
+        """
+        self.path = f"{path}.{os.getpid()}.tmp"
+        self.m = m
+        self.n = n
+        self.size = m * n
+        self._map("w+")
+        self._header["magic"] = MEMMAP_MAGIC
+        self._header["version"] = MEMMAP_VERSION
+        self._header["m"] = m
+        self._header["n"] = n
+        os.replace(self.path, path)
+        self.path = path
+
+    @classmethod
+    def open(cls, path: str, readonly: bool = False) -> "MemmapGrid":
+        """
+        Map an existing grid file, e.g. to resume a run after a restart.
+        """
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header["magic"][0] != MEMMAP_MAGIC:
+            raise ValueError(f"Not a grid state file: {path}")
+        if header["version"][0] != MEMMAP_VERSION:
+            raise ValueError(f"Unsupported grid state version: {header['version'][0]}")
+
+        grid = cls.__new__(cls)
+        grid.path = path
+        grid.m = int(header["m"][0])
+        grid.n = int(header["n"][0])
+        grid.size = grid.m * grid.n
+        grid._map("r" if readonly else "r+")
+        return grid
+
+    def _map(self, mode: str) -> None:
+        bits_size = (self.size + 7) // 8
+        length = HEADER_SIZE + bits_size + self.size * 3
+        self._raw = np.memmap(self.path, dtype=np.uint8, mode=mode, shape=(length,))
+        self._header = self._raw[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)
+        self.bits = self._raw[HEADER_SIZE:HEADER_SIZE + bits_size]
+        self.colors = self._raw[HEADER_SIZE + bits_size:].reshape(self.size, 3)
+
+    @property
+    def filled(self) -> int:
+        return int(self._header["filled"][0])
+
+    @filled.setter
+    def filled(self, value: int) -> None:
+        self._header["filled"] = value
+
+    @property
+    def cursor(self) -> int:
+        return int(self._header["cursor"][0])
+
+    @cursor.setter
+    def cursor(self, value: int) -> None:
+        self._header["cursor"] = value
+
+    @property
+    def generation(self) -> str:
+        return self._header["generation"][0].decode()
+
+    @generation.setter
+    def generation(self, value: str) -> None:
+        self._header["generation"] = value.encode()
+
+    @property
+    def seed(self) -> int:
+        return int(self._header["seed"][0])
+
+    @seed.setter
+    def seed(self, value: int) -> None:
+        self._header["seed"] = value
+
+    def store_colors(self, indices, colors):
+        self.colors[indices] = colors
+
+    def flush(self):
+        self._raw.flush()
+
+    @property
+    def nbytes(self):
+        # The header and fill bits are touched by every write and stay
+        # resident; the colors are written once and left to the page cache
+        return HEADER_SIZE + self.bits.nbytes
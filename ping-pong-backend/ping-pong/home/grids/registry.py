@@ -0,0 +1,24 @@
+from home.grids.base import OccupancyGrid
+from home.grids.bitmap import BitmapGrid
+from home.grids.dense import DenseGrid
+from home.grids.interval import IntervalGrid
+from home.grids.memmap import MemmapGrid
+
+GRID_BACKENDS = {
+    DenseGrid.name: DenseGrid,
+    BitmapGrid.name: BitmapGrid,
+    MemmapGrid.name: MemmapGrid,
+    IntervalGrid.name: IntervalGrid,
+}
+
+
+def create_grid(backend: str, m: int, n: int, path: str | None = None) -> OccupancyGrid:
+    try:
+        grid_class = GRID_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown grid backend: {backend}")
+    if grid_class.persistent:
+        if not path:
+            raise ValueError(f"Grid backend {backend} needs a state file path")
+        return grid_class(m, n, path)
+    return grid_class(m, n)
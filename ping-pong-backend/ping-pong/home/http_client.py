@@ -0,0 +1,135 @@
+import json
+import threading
+
+import numpy as np
+import requests
+from django.apps import apps
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from home.utils import wire
+
+
+class PooledHTTPClient:
+    """
+    Process-wide keep-alive HTTP client for the hops between services.
+
+    One `requests.Session` with a sized connection pool per host is shared by
+    every strategy and view, so consecutive hops to ping, pong and the main
+    service reuse open TCP connections instead of connecting for each request.
+    Request and connection counters feed the /metrics/ endpoint.
+
+    Hop and update payloads go out in `wire_format`: "binary" for the compact
+    format of `home.utils.wire`, or "json".
+    """
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float, wire_format: str = "json"):
+        if wire_format not in ("binary", "json"):
+            raise ValueError(f"Unknown wire format: {wire_format}")
+        self.timeout = (connect_timeout, read_timeout)
+        self.wire_format = wire_format
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        adapter = _CountingAdapter(self, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def post(self, url: str, json=None, timeout: float | tuple[float, float] | None = None, **kwargs) -> requests.Response:
+        """
+        POST through the shared pool; `timeout` defaults to the configured (connect, read) pair.
+        """
+        self._count("requests")
+        return self.session.post(url, json=json, timeout=timeout or self.timeout, **kwargs)
+
+    def post_payload(self, url: str, payload: dict, timeout: float | tuple[float, float] | None = None) -> requests.Response:
+        """
+        POST a hop or update payload, which may hold NumPy arrays, in the configured wire format.
+        """
+        if self.wire_format == "binary":
+            body, content_type = wire.encode(payload), wire.WIRE_MEDIA_TYPE
+        else:
+            body, content_type = json.dumps(payload, default=_json_default).encode(), "application/json"
+        return self.post(url, data=body, headers={"Content-Type": content_type}, timeout=timeout)
+
+    @property
+    def reused_connections(self) -> int:
+        return max(self.requests - self.connections, 0)
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _CountingAdapter(HTTPAdapter):
+    """
+    Adapter whose connection pools report every new TCP connection to the client.
+    """
+
+    def __init__(self, client: PooledHTTPClient, **kwargs):
+        self.client = client
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        client = self.client
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                client._count("connections")
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                client._count("connections")
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> PooledHTTPClient:
+    """
+    Get the shared client, created from the home app settings on first use.
+    """
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            config = apps.get_app_config('home')
+            _CLIENT = PooledHTTPClient(
+                config.HTTP_POOL_SIZE,
+                config.HTTP_CONNECT_TIMEOUT,
+                config.HTTP_READ_TIMEOUT,
+                config.HOP_WIRE_FORMAT,
+            )
+        return _CLIENT
+
+
+def post(url: str, json=None, timeout: float | tuple[float, float] | None = None, **kwargs) -> requests.Response:
+    """
+    Shortcut for `get_client().post(...)`, a drop-in for `requests.post`.
+    """
+    return get_client().post(url, json=json, timeout=timeout, **kwargs)
+
+
+def post_payload(url: str, payload: dict, timeout: float | tuple[float, float] | None = None) -> requests.Response:
+    """
+    Shortcut for `get_client().post_payload(...)`.
+    """
+    return get_client().post_payload(url, payload, timeout=timeout)
@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from home.image_strategies.planner import get_planner
+
 
 class ImageGenerationStrategy(ABC):
     min_pixels: int
@@ -12,6 +14,24 @@ class ImageGenerationStrategy(ABC):
             return total_pixels >= self.min_pixels
         return self.min_pixels <= total_pixels <= self.max_pixels
 
+    @staticmethod
+    def lane(data, total_pixels: int) -> dict:
+        """
+        Lane fields of a hop: the chain's id and the [lane_start, lane_end)
+        index range it fills; the whole grid unless `generate` split it.
+        """
+        return {
+            "lane": data.get('lane', 0),
+            "lane_start": data.get('lane_start', 0),
+            "lane_end": data.get('lane_end', total_pixels),
+        }
+
+    def plan_batch(self, remaining: int) -> int:
+        """
+        Number of pixels to add on this hop, from the shared latency-adaptive planner.
+        """
+        return get_planner().batch_size(remaining)
+
     @abstractmethod
     def handle(self, request: Request, next_url: str) -> Response:
         pass
@@ -1,48 +1,56 @@
-import requests
 from django.apps import apps
 from rest_framework.response import Response
 
+from home import dispatch, progress
 from home.image_strategies.base import ImageGenerationStrategy
-
-from home import state
+from home.utils.positions import index_to_xy
 
 class MediumImageStrategy(ImageGenerationStrategy):
-    min_pixels = 785
     max_pixels = 10_000
 
+    @property
+    def min_pixels(self) -> int:
+        return apps.get_app_config('home').RANDOM_MAX_PIXELS + 1
+
     def handle(self, request, next_url):
-        current_index = state.CURRENT_Y * state.GRID_N + state.CURRENT_X
+        data = request.data
+        m = data['m']
+        n = data['n']
+        lane = self.lane(data, m * n)
+        # The next pixel travels with the hop, so it never waits on the main service
+        current_index = data.get('next_index', lane["lane_start"])
 
         # Check if done
-        if current_index >= state.GRID_M * state.GRID_N:
-            return Response({"status": "done"})
+        if current_index >= lane["lane_end"]:
+            return Response({"status": "done", **lane})
         
-        # Store current position for response
-        current_x, current_y = state.CURRENT_X, state.CURRENT_Y
+        # Consecutive pixels from the current index, as many as the planner allows
+        batch_size = self.plan_batch(lane["lane_end"] - current_index)
+        next_index = current_index + batch_size
+        current_x, current_y = index_to_xy(current_index, n)
         
-        # Update main service with current pixel
-        try:
-            requests.post(
-                f"{apps.get_app_config('home').MAIN_URL}/status/update_pixel/",
-                json={"pixel": {"x": current_x, "y": current_y}},
-                timeout=2
-            )
-        except:
-            pass
+        # Report the pixels to the main service in the background
+        progress.get_reporter(data.get('session'), data.get('token')).add_range(current_index, next_index)
 
         # Send to next service
         payload = {
-            "m": state.GRID_M, 
-            "n": state.GRID_N, 
+            "session": data.get('session'),
+            "token": data.get('token'),
+            "m": m, 
+            "n": n, 
+            **lane,
             "position": (current_x, current_y),
-            "index": current_index
+            "index": current_index,
+            "batch_size": batch_size,
+            "next_index": next_index
         }
 
-        requests.post(next_url, json=payload, timeout=30)
+        dispatch.forward(next_url, payload)
 
         return Response({
             "status": "pixel_added",
             "position": (current_x, current_y),
             "index": current_index,
+            "batch_size": batch_size,
             "method": "medium_sequential"
         })
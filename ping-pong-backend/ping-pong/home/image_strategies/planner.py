@@ -0,0 +1,86 @@
+import threading
+
+from django.apps import apps
+
+
+class BatchPlanner:
+    """
+    Picks how many pixels each hop adds, from measured costs.
+
+    A hop of b pixels is modelled as `latency + cost * b` seconds: `latency`
+    is the round trip of a forward to the next service, `cost` the time the
+    main service takes to apply one reported pixel. Both are exponential
+    moving averages of recent samples, and the batch is sized to make a hop
+    take `target` seconds. Until the costs are known, or when the latency
+    alone exceeds the target, batches grow geometrically from `min_batch`.
+    """
+    # Largest factor by which a batch may grow from one hop to the next
+    GROWTH = 4
+
+    def __init__(self, target: float, min_batch: int = 1, max_batch: int = 2_000_000, smoothing: float = 0.3):
+        self.target = target
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.smoothing = smoothing
+        self.latency = None
+        self.cost = None
+        self.last_batch = min_batch
+        self._lock = threading.Lock()
+
+    def _average(self, current: float | None, sample: float) -> float:
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def observe_hop(self, seconds: float) -> None:
+        """
+        Record the round trip of one forward to the next service.
+        """
+        with self._lock:
+            self.latency = self._average(self.latency, seconds)
+
+    def observe_pixels(self, pixels: int, seconds: float) -> None:
+        """
+        Record a request that took `seconds` to apply `pixels` pixels.
+
+        The request's own round trip, estimated by the hop latency, is not
+        per-pixel work and is left out.
+        """
+        if pixels <= 0:
+            return
+        with self._lock:
+            work = max(seconds - (self.latency or 0), 0)
+            self.cost = self._average(self.cost, work / pixels)
+
+    def batch_size(self, remaining: int | None = None) -> int:
+        """
+        Get the number of pixels the next hop should add.
+        """
+        with self._lock:
+            ceiling = min(self.max_batch, self.last_batch * self.GROWTH)
+            if self.latency is None or not self.cost or self.latency >= self.target:
+                batch = ceiling
+            else:
+                batch = int((self.target - self.latency) / self.cost)
+            batch = max(self.min_batch, min(batch, ceiling))
+            # The end of a run does not hold back the growth of the next one
+            self.last_batch = batch
+        if remaining is not None:
+            batch = max(min(batch, remaining), 0)
+        return batch
+
+
+_PLANNER = None
+_PLANNER_LOCK = threading.Lock()
+
+
+def get_planner() -> BatchPlanner:
+    """
+    Get the planner shared by all strategies, created from the home app settings on first use.
+    """
+    global _PLANNER
+    with _PLANNER_LOCK:
+        if _PLANNER is None:
+            config = apps.get_app_config('home')
+            _PLANNER = BatchPlanner(config.HOP_TARGET_SECONDS, config.BATCH_MIN, config.BATCH_MAX)
+        return _PLANNER
@@ -1,48 +1,71 @@
-import requests
+import random
+
+import numpy as np
 from django.apps import apps
 from rest_framework.response import Response
 
+from home import dispatch, progress
 from home.image_strategies.base import ImageGenerationStrategy
-from home.utils.positions import random_empty_position
-from home.utils.colors import random_unique_color
+from home.utils.positions import RandomPositionSampler
+from home.utils.colors import UniqueColorAllocator
 
 
 class SmallImageStrategy(ImageGenerationStrategy):
     min_pixels = 0
-    max_pixels = 784
+
+    @property
+    def max_pixels(self) -> int:
+        return apps.get_app_config('home').RANDOM_MAX_PIXELS
 
     def handle(self, request, next_url):
         data = request.data
         m = data['m']
         n = data['n']
 
-        image_data = data.get('image', [])
-        image = {(p['x'], p['y']): tuple(p['color']) for p in image_data}
-        used_colors = set(image.values())
+        seed = data.get('seed')
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        # Hops carry only the newly added pixels: the sequence number of the next
+        # draw is the sampler and allocator cursor, and the main service holds
+        # the image and colors. A lane draws only the sequence numbers of its
+        # own index range, so positions and colors stay unique across lanes
+        lane = self.lane(data, m * n)
+        seq = data.get('seq', lane["lane_start"])
 
-        if len(image) >= m * n:
-            return Response({"status": "done"})
+        if seq >= lane["lane_end"]:
+            return Response({"status": "done", **lane})
 
-        (x, y) = random_empty_position(m, n, image)
-        color = random_unique_color(used_colors)
-        image[(x, y)] = color
+        batch_size = self.plan_batch(lane["lane_end"] - seq)
+        sampler = RandomPositionSampler(m, n, seed + lane["lane"], lane["lane_start"], lane["lane_end"])
+        xs, ys = sampler.draws(seq, batch_size)
+        colors = UniqueColorAllocator(seed).colors(np.arange(seq, seq + batch_size))
 
-        try:
-            requests.post(
-                f"{apps.get_app_config('home').MAIN_URL}/status/update_pixel/",
-                json={"pixel": {"x": x, "y": y, "color": list(color)}, "n": n},
-                timeout=2
-            )
-        except:
-            pass
+        reporter = progress.get_reporter(data.get('session'), data.get('token'))
+        pixels = [
+            {"x": x, "y": y, "color": color}
+            for x, y, color in zip(xs.tolist(), ys.tolist(), colors.tolist())
+        ]
+        for pixel in pixels:
+            reporter.add_pixel(pixel["x"], pixel["y"], pixel["color"])
 
-        new_image = [{"x": px, "y": py, "color": list(pc)} for (px, py), pc in image.items()]
-        payload = {"m": m, "n": n, "image": new_image}
+        payload = {
+            "session": data.get('session'),
+            "token": data.get('token'),
+            "m": m,
+            "n": n,
+            **lane,
+            "seed": seed,
+            "generation": data.get('generation', ""),
+            "seq": seq + batch_size,
+            "pixel_xy": np.stack([xs, ys], axis=1),
+            "pixel_colors": colors,
+        }
 
-        requests.post(next_url, json=payload, timeout=30)
+        dispatch.forward(next_url, payload)
 
         return Response({
             "status": "pixel_added",
-            "pixel": {"x": x, "y": y, "color": list(color)},
+            "pixels": pixels,
             "method": "small_random"
         })
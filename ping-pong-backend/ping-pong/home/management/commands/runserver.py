@@ -0,0 +1,23 @@
+import socket
+
+from django.contrib.staticfiles.management.commands.runserver import Command as RunserverCommand
+from django.core.servers.basehttp import WSGIServer
+
+
+class NoDelayWSGIServer(WSGIServer):
+    """
+    Development server with Nagle's algorithm disabled on accepted connections.
+
+    The server writes the response headers and body separately. On a kept-alive
+    connection the body then waits for the client's delayed ACK (~40 ms), so
+    pooled hops between services would be slower than fresh connections.
+    """
+
+    def get_request(self):
+        connection, address = super().get_request()
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return connection, address
+
+
+class Command(RunserverCommand):
+    server_cls = NoDelayWSGIServer
@@ -0,0 +1,101 @@
+import threading
+from typing import Callable
+
+from home import caching, cancellation, dispatch, http_client, progress, sessions, transport
+from home.image_strategies.planner import get_planner
+
+_LOCK = threading.Lock()
+_METRICS = {}
+
+
+def register(name: str, help_text: str, collect: Callable[[], float], kind: str = "gauge") -> None:
+    """
+    Register a metric whose current value is read from `collect` at scrape time.
+    """
+    with _LOCK:
+        _METRICS[name] = (help_text, kind, collect)
+
+
+def render() -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format.
+    """
+    with _LOCK:
+        metrics = sorted(_METRICS.items())
+    lines = []
+    for name, (help_text, kind, collect) in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {collect()}")
+    return "\n".join(lines) + "\n"
+
+
+def _latest(attribute: Callable, default: float = 0) -> Callable[[], float]:
+    def collect():
+        session = sessions.get_store().latest
+        return default if session is None else attribute(session)
+    return collect
+
+
+register("pingpong_filled_pixels", "Pixels filled in the latest session.", _latest(lambda s: s.filled_count()))
+register("pingpong_total_pixels", "Pixels in the grid of the latest session.", _latest(lambda s: s.m * s.n))
+register("pingpong_grid_bytes", "Memory held by the grid fill mask of the latest session.", _latest(lambda s: s.grid.nbytes))
+register("pingpong_sessions", "Generation sessions kept in memory.", lambda: len(sessions.get_store()))
+register("pingpong_session_bytes", "Approximate memory held by all sessions.", lambda: sessions.get_store().nbytes)
+register(
+    "pingpong_sessions_evicted_total", "Sessions evicted for idle time, count or memory budget.",
+    lambda: sessions.get_store().evicted, kind="counter",
+)
+register(
+    "pingpong_http_requests_total", "Requests sent by the pooled inter-service client.",
+    lambda: http_client.get_client().requests, kind="counter",
+)
+register(
+    "pingpong_http_connections_total", "TCP connections opened by the pooled inter-service client.",
+    lambda: http_client.get_client().connections, kind="counter",
+)
+register(
+    "pingpong_http_reused_connections_total", "Requests served over an already open connection.",
+    lambda: http_client.get_client().reused_connections, kind="counter",
+)
+register(
+    "pingpong_loopback_requests_total", "Hops and updates delivered in process instead of over HTTP.",
+    lambda: transport.get_transport().local_requests, kind="counter",
+)
+register(
+    "pingpong_cancelled_work_total", "Hops and queued forwards dropped because their run was cancelled.",
+    lambda: cancellation.CANCELLED.dropped, kind="counter",
+)
+register(
+    "pingpong_hop_dispatch_pending", "Hops queued or in flight on the background dispatcher.",
+    lambda: dispatch.get_dispatcher().pending,
+)
+register(
+    "pingpong_progress_pending", "Progress updates buffered or in flight to the main service.",
+    lambda: progress.pending(),
+)
+register(
+    "pingpong_progress_dropped_total", "Progress updates dropped because their run was cancelled, rejected or given up.",
+    lambda: progress.dropped(), kind="counter",
+)
+register(
+    "pingpong_progress_failed_runs_total", "Runs left incomplete because their progress updates kept failing.",
+    lambda: progress.failed(), kind="counter",
+)
+register(
+    "pingpong_planned_batch_size", "Pixels per hop chosen by the batch planner.",
+    lambda: get_planner().last_batch,
+)
+register(
+    "pingpong_hop_latency_seconds", "Average forward round trip seen by the batch planner.",
+    lambda: get_planner().latency or 0,
+)
+register(
+    "pingpong_ui_cache_hits_total", "Full /ui/ responses served from the rendered body cache.",
+    lambda: caching.get_ui_cache().hits, kind="counter",
+)
+register(
+    "pingpong_ui_cache_misses_total", "Full /ui/ responses rendered because no cached body matched.",
+    lambda: caching.get_ui_cache().misses, kind="counter",
+)
+register("pingpong_ui_cache_bytes", "Memory held by cached /ui/ bodies.", lambda: caching.get_ui_cache().nbytes)
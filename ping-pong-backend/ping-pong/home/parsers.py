@@ -0,0 +1,19 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from home.utils import wire
+
+
+class WireParser(BaseParser):
+    """
+    Parses the compact binary hop/update format of `home.utils.wire`.
+
+    Array fields arrive as NumPy arrays backed by the request body.
+    """
+    media_type = wire.WIRE_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return wire.decode(stream.read())
+        except ValueError as e:
+            raise ParseError(f"Wire parse error - {e}")
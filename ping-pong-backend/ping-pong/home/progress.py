@@ -0,0 +1,300 @@
+import logging
+import threading
+import time
+
+import numpy as np
+import requests
+from django.apps import apps
+
+from home import transport
+from home.cancellation import CANCELLED
+from home.image_strategies.planner import get_planner
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """
+    Buffers pixel and range updates from the strategies and sends them to the
+    main service's status/update_pixel/ in merged batches.
+
+    A background thread flushes once `batch_size` updates are buffered or
+    `flush_interval` seconds after the first one, so hops never wait on the
+    main service. Contiguous ranges are merged as they arrive. Past
+    `max_buffer` buffered updates, adding one waits until the thread sent
+    some, so a slow main service slows the hops down instead of losing fills.
+
+    A failed batch is put back and retried with exponential backoff, up to
+    `max_retries` times in a row. The reporter then gives up: it is flagged
+    `failed`, the run stays incomplete in the main service, and its updates
+    are dropped from then on.
+
+    Batches are tagged with `session` and the run `token`. A batch the main
+    service rejects, e.g. for an evicted session, is dropped instead of
+    retried; a 409 marks the run cancelled, which drops the rest of its
+    updates too. Dropped updates are counted in `dropped`. The thread exits
+    after `IDLE_TIMEOUT` seconds without updates.
+    """
+    MAX_BACKOFF = 5.0
+    IDLE_TIMEOUT = 30.0
+
+    def __init__(self, url: str, batch_size: int, flush_interval: float, max_buffer: int, timeout: float,
+                 max_retries: int, session: str | None = None, token: str | None = None):
+        self.url = url
+        self.session = session
+        self.token = token
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.ranges = []
+        self.pixels = []
+        self.in_flight = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failures = 0
+        self.failed = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def add_range(self, start: int, end: int) -> None:
+        with self._condition:
+            if self.ranges and self.ranges[-1][1] == start:
+                self.ranges[-1] = (self.ranges[-1][0], end)
+            elif self._wait_for_room():
+                self.ranges.append((start, end))
+            else:
+                return
+            self._added()
+
+    def add_pixel(self, x: int, y: int, color: tuple[int, int, int]) -> None:
+        with self._condition:
+            if not self._wait_for_room():
+                return
+            self.pixels.append((x, y, *color))
+            self._added()
+
+    def _wait_for_room(self) -> bool:
+        """
+        Wait until the buffer has room; returns False, counting the update as
+        dropped, if it can no longer be sent.
+        """
+        while True:
+            if self.failed or CANCELLED.is_cancelled(self.token):
+                self.dropped += 1
+                return False
+            if len(self.ranges) + len(self.pixels) < self.max_buffer:
+                return True
+            self._condition.wait()
+
+    def _added(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="progress-reporter", daemon=True)
+            self._thread.start()
+        self._condition.notify_all()
+
+    @property
+    def pending(self) -> int:
+        """
+        Updates buffered or being sent.
+        """
+        with self._condition:
+            return len(self.ranges) + len(self.pixels) + self.in_flight
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until every buffered update was sent; returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.ranges or self.pixels or self.in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _take(self) -> tuple[list, list] | None:
+        with self._condition:
+            while not (self.ranges or self.pixels):
+                if not self._condition.wait(self.IDLE_TIMEOUT) and not (self.ranges or self.pixels):
+                    self._thread = None
+                    return None
+            # Give the batch time to fill up, unless it already is full
+            deadline = time.monotonic() + self.flush_interval
+            while len(self.ranges) + len(self.pixels) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            ranges = self.ranges[:self.batch_size]
+            pixels = self.pixels[:self.batch_size - len(ranges)]
+            del self.ranges[:len(ranges)]
+            del self.pixels[:len(pixels)]
+            self.in_flight = len(ranges) + len(pixels)
+            # Wake the callers waiting for room
+            self._condition.notify_all()
+        return ranges, pixels
+
+    def _discard(self) -> None:
+        """
+        Drop the batch in flight and, once the run is cancelled, everything buffered.
+        """
+        with self._condition:
+            self.dropped += self.in_flight
+            self.in_flight = 0
+            if self.failed or CANCELLED.is_cancelled(self.token):
+                self.dropped += len(self.ranges) + len(self.pixels)
+                self.ranges = []
+                self.pixels = []
+            self._condition.notify_all()
+
+    def _put_back(self, ranges: list, pixels: list) -> None:
+        with self._condition:
+            self.ranges[:0] = ranges
+            self.pixels[:0] = pixels
+            self.in_flight = 0
+            self._added()
+
+    def _run(self) -> None:
+        backoff = self.flush_interval
+        retries = 0
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            ranges, pixels = batch
+            if CANCELLED.is_cancelled(self.token):
+                self._discard()
+                continue
+            try:
+                started = time.perf_counter()
+                response = transport.send(
+                    self.url, _batch_payload(ranges, pixels, self.session, self.token), timeout=self.timeout
+                )
+                response.raise_for_status()
+                # Per-pixel cost of applying updates in the main service
+                get_planner().observe_pixels(
+                    sum(end - start for start, end in ranges) + len(pixels),
+                    time.perf_counter() - started,
+                )
+            except requests.exceptions.RequestException as e:
+                if _rejected(e):
+                    logger.warning("Progress batch rejected, dropping it: %s", e)
+                    if e.response.status_code == 409:
+                        CANCELLED.cancel(self.token)
+                    self._discard()
+                    continue
+                self.failures += 1
+                if retries >= self.max_retries:
+                    logger.error(
+                        "Giving up reporting progress of session %s after %d retries, the run is incomplete: %s",
+                        self.session, retries, e,
+                    )
+                    with self._condition:
+                        self.failed = True
+                    self._discard()
+                    continue
+                logger.warning("Error reporting progress, retrying in %.2fs: %s", backoff, e)
+                self._put_back(ranges, pixels)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+                retries += 1
+                continue
+
+            except Exception:
+                # The batch cannot be sent as built: drop it, but keep the thread serving the run
+                logger.exception("Unexpected error reporting progress of session %s", self.session)
+                self._discard()
+                continue
+
+            backoff = self.flush_interval
+            retries = 0
+            with self._condition:
+                self.sent += self.in_flight
+                self.in_flight = 0
+                self._condition.notify_all()
+
+
+def _rejected(error: requests.exceptions.RequestException) -> bool:
+    """
+    Whether the main service refused the batch itself, so a retry cannot succeed.
+    """
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500
+
+
+def _batch_payload(ranges: list, pixels: list, session: str | None = None, token: str | None = None) -> dict:
+    """
+    Pack a batch as {"session", "token", "ranges": (k, 2) int64, "pixel_xy": (p, 2) uint32,
+    "pixel_colors": (p, 3) uint8}.
+    """
+    pixels = np.array(pixels, dtype=np.int64).reshape(-1, 5)
+    return {
+        "session": session,
+        "token": token,
+        "ranges": np.array(ranges, dtype=np.int64).reshape(-1, 2),
+        "pixel_xy": pixels[:, :2].astype(np.uint32),
+        "pixel_colors": pixels[:, 2:].astype(np.uint8),
+    }
+
+
+_REPORTERS = {}
+_REPORTERS_LOCK = threading.Lock()
+# Updates dropped and runs given up by reporters that were since forgotten
+_FORGOTTEN_DROPPED = 0
+_FORGOTTEN_FAILED = 0
+
+
+def get_reporter(session: str | None = None, token: str | None = None) -> ProgressReporter:
+    """
+    Get the reporter of a session's run, created from the home app settings on first use.
+
+    Reporters with nothing left to send are forgotten when another one is created.
+    """
+    global _FORGOTTEN_DROPPED, _FORGOTTEN_FAILED
+    with _REPORTERS_LOCK:
+        reporter = _REPORTERS.get((session, token))
+        if reporter is None:
+            for key, idle in list(_REPORTERS.items()):
+                if idle.pending == 0:
+                    _FORGOTTEN_DROPPED += idle.dropped
+                    _FORGOTTEN_FAILED += idle.failed
+                    del _REPORTERS[key]
+            config = apps.get_app_config('home')
+            reporter = _REPORTERS[(session, token)] = ProgressReporter(
+                f"{config.PROGRESS_URL}/status/update_pixel/",
+                batch_size=config.PROGRESS_BATCH_SIZE,
+                flush_interval=config.PROGRESS_FLUSH_INTERVAL,
+                max_buffer=config.PROGRESS_MAX_BUFFER,
+                timeout=config.HTTP_UPDATE_TIMEOUT,
+                max_retries=config.PROGRESS_MAX_RETRIES,
+                session=session,
+                token=token,
+            )
+        return reporter
+
+
+def pending() -> int:
+    """
+    Updates buffered or being sent by all reporters.
+    """
+    with _REPORTERS_LOCK:
+        return sum(reporter.pending for reporter in _REPORTERS.values())
+
+
+def dropped() -> int:
+    """
+    Updates dropped by all reporters so far.
+    """
+    with _REPORTERS_LOCK:
+        return _FORGOTTEN_DROPPED + sum(reporter.dropped for reporter in _REPORTERS.values())
+
+
+def failed() -> int:
+    """
+    Runs whose progress reporting was given up so far.
+    """
+    with _REPORTERS_LOCK:
+        return _FORGOTTEN_FAILED + sum(reporter.failed for reporter in _REPORTERS.values())
@@ -0,0 +1,110 @@
+import threading
+
+import numpy as np
+
+from home import colorize
+from home.state import Session
+from home.utils.raster import downsample
+
+# Level-1 rows rebuilt at once from the full-resolution image, to bound the
+# memory of a large rebuild
+CHUNK_ROWS = 256
+# Dirty row spans kept apart before they are merged into one
+MAX_DIRTY_SPANS = 64
+
+
+class ImagePyramid:
+    """
+    Downsampled RGBA levels of a session's image, for viewport tiles.
+
+    Level 0 is the image itself and is read from the grid on demand; level
+    k halves level k - 1 (see `downsample`) until the image is one pixel, so
+    the levels together take a third of the full RGBA raster.
+
+    Writes only mark the rows they touched through `invalidate`, which the
+    session calls under its lock, so the fill path stays O(1). The marked
+    rows are folded into every level before the next tile is read, costing
+    time proportional to the changed area.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.levels = [None]
+        height, width = session.m, session.n
+        while height > 1 or width > 1:
+            height, width = (height + 1) // 2, (width + 1) // 2
+            self.levels.append(np.zeros((height, width, 4), dtype=np.uint8))
+        # Row spans [first, last) of the image changed since the last refresh
+        self._dirty = []
+        self._lock = threading.Lock()
+        if session.filled_count() > 0:
+            self.invalidate(0, session.m * session.n)
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels)
+
+    def shape(self, level: int) -> tuple[int, int]:
+        """
+        Get the (height, width) of a level.
+        """
+        if level == 0:
+            return self.session.m, self.session.n
+        return self.levels[level].shape[:2]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels[1:])
+
+    def invalidate(self, start: int, end: int) -> None:
+        """
+        Mark the rows holding the linear indices [start, end) as changed.
+        """
+        if end <= start or self.depth == 1:
+            return
+        first, last = start // self.session.n, (end - 1) // self.session.n + 1
+        if self._dirty and self._dirty[-1][0] <= last and first <= self._dirty[-1][1]:
+            previous_first, previous_last = self._dirty[-1]
+            self._dirty[-1] = (min(first, previous_first), max(last, previous_last))
+        else:
+            self._dirty.append((first, last))
+        if len(self._dirty) > MAX_DIRTY_SPANS:
+            self._dirty = [(min(span[0] for span in self._dirty), max(span[1] for span in self._dirty))]
+
+    def tile(self, level: int, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """
+        Get the (y1 - y0, x1 - x0, 4) RGBA window of a level, in that level's pixels.
+        """
+        if level == 0:
+            return colorize.rgba_window(self.session, y0, y1, x0, x1)
+        with self._lock:
+            self._refresh()
+            return self.levels[level][y0:y1, x0:x1].copy()
+
+    def _refresh(self) -> None:
+        with self.session.lock:
+            dirty, self._dirty = self._dirty, []
+        for first, last in dirty:
+            self._rebuild(first, last)
+
+    def _rebuild(self, first: int, last: int) -> None:
+        top, bottom = first // 2, (last + 1) // 2
+        for row in range(top, bottom, CHUNK_ROWS):
+            end = min(row + CHUNK_ROWS, bottom)
+            rows = colorize.rgba_window(self.session, row * 2, min(end * 2, self.session.m))
+            self.levels[1][row:end] = downsample(rows)
+
+        for level in range(2, self.depth):
+            below = self.levels[level - 1]
+            top, bottom = top // 2, (bottom + 1) // 2
+            self.levels[level][top:bottom] = downsample(below[top * 2:min(bottom * 2, below.shape[0])])
+
+
+def get_pyramid(session: Session) -> ImagePyramid:
+    """
+    Get the pyramid of a session, built on first use and kept up to date by its writes.
+    """
+    with session.lock:
+        if session.pyramid is None:
+            session.pyramid = ImagePyramid(session)
+        return session.pyramid
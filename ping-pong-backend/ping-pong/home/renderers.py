@@ -0,0 +1,82 @@
+import json
+from abc import ABC, abstractmethod
+
+from rest_framework.renderers import BaseRenderer
+
+from home.utils.raster import encode_gzip, encode_png, encode_raw, encode_zlib
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF negotiate `text/event-stream`; the view streams the body itself.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data.encode() if isinstance(data, str) else json.dumps(data).encode()
+
+
+class RasterRenderer(BaseRenderer, ABC):
+    """
+    Base renderer for the binary raster endpoint.
+
+    Views hand over {"raster": ndarray, "colored_pixels": int}; anything else
+    is rendered as plain JSON bytes; error responses are switched to
+    JSONRenderer by `home.exceptions.exception_handler`.
+    """
+    charset = None
+    render_style = 'binary'
+
+    @abstractmethod
+    def encode(self, raster, colored_pixels):
+        """
+        Encode a (m, n, channels) uint8 raster into the response body.
+        """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict) or 'raster' not in data:
+            return json.dumps(data).encode()
+        return self.encode(data['raster'], data['colored_pixels'])
+
+
+class PNGRasterRenderer(RasterRenderer):
+    media_type = 'image/png'
+    format = 'png'
+
+    def encode(self, raster, colored_pixels):
+        return encode_png(raster, colored_pixels)
+
+
+class RawRasterRenderer(RasterRenderer):
+    media_type = 'application/octet-stream'
+    format = 'raw'
+
+    def encode(self, raster, colored_pixels):
+        return encode_raw(raster, colored_pixels)
+
+
+class ZlibRasterRenderer(RasterRenderer):
+    media_type = 'application/zlib'
+    format = 'zlib'
+
+    def encode(self, raster, colored_pixels):
+        return encode_zlib(raster, colored_pixels)
+
+
+class GzipRasterRenderer(RasterRenderer):
+    media_type = 'application/gzip'
+    format = 'gzip'
+
+    def encode(self, raster, colored_pixels):
+        return encode_gzip(raster, colored_pixels)
@@ -1,9 +1,32 @@
 from rest_framework import serializers
 
+from home.grids.registry import GRID_BACKENDS
+
 
 class ConfigSerializer(serializers.Serializer):
     m = serializers.IntegerField(min_value=1)
     n = serializers.IntegerField(min_value=1)
+    backend = serializers.ChoiceField(choices=list(GRID_BACKENDS), required=False)
+    seed = serializers.IntegerField(min_value=0, required=False)
+
+
+class GenerateSerializer(serializers.Serializer):
+    session = serializers.CharField(required=False)
+    lanes = serializers.IntegerField(min_value=1, required=False)
+
+
+class ImagePageSerializer(serializers.Serializer):
+    session = serializers.CharField(required=False)
+    start = serializers.IntegerField(min_value=0, required=False)
+
+
+class TileSerializer(serializers.Serializer):
+    session = serializers.CharField(required=False)
+    x = serializers.IntegerField(min_value=0, default=0)
+    y = serializers.IntegerField(min_value=0, default=0)
+    w = serializers.IntegerField(min_value=1)
+    h = serializers.IntegerField(min_value=1)
+    z = serializers.IntegerField(min_value=0, default=0)
 
 
 class PixelSerializer(serializers.Serializer):
@@ -0,0 +1,207 @@
+import atexit
+import glob
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.apps import apps
+
+from home import caching
+from home.cancellation import CANCELLED, notify_hop_services
+from home.state import Session
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitError(Exception):
+    """
+    Raised when a new session alone exceeds the memory budget.
+    """
+
+
+class SessionStore:
+    """
+    Generation sessions by id, with LRU and idle-time eviction.
+
+    Each `configure` call creates a session instead of wiping the running
+    one. Sessions idle for more than `ttl` seconds are dropped, and the least
+    recently used ones are evicted while there are more than `max_sessions`
+    or their combined `nbytes` exceeds `memory_budget`. Evicted sessions are
+    flagged `closed`, which ends their event streams, and memmap sessions
+    lose their state file.
+
+    Requests that name no session use the latest configured one.
+    """
+
+    def __init__(self, max_sessions: int, ttl: float, memory_budget: int, state_path: str | None = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.memory_budget = memory_budget
+        self.state_path = state_path
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def state_file(self, session_id: str) -> str | None:
+        """
+        Get the memmap state file of a session, next to the configured state path.
+        """
+        if self.state_path is None:
+            return None
+        root, ext = os.path.splitext(self.state_path)
+        return f"{root}-{session_id}{ext}"
+
+    def create(self, m: int, n: int, backend: str | None = None, seed: int | None = None) -> Session:
+        """
+        Start a new session on an empty m x n grid and make it the latest one.
+
+        Raises:
+            SessionLimitError: if the session alone does not fit the memory budget
+        """
+        session_id = uuid.uuid4().hex[:12]
+        session = Session(m, n, backend=backend, path=self.state_file(session_id), seed=seed, generation=session_id)
+        if session.nbytes > self.memory_budget:
+            self._discard(session)
+            raise SessionLimitError(
+                f"A {m}x{n} grid needs {session.nbytes} bytes, over the {self.memory_budget} byte session budget"
+            )
+        self.add(session)
+        return session
+
+    def add(self, session: Session) -> None:
+        """
+        Keep `session`, e.g. one restored from disk, as the latest one.
+        """
+        with self._lock:
+            self._sessions[session.id] = session
+            self._latest = session.id
+            evicted = self._evict(keep=session.id)
+        for old in evicted:
+            self._discard(old)
+
+    def get(self, session_id: str | None = None) -> Session | None:
+        """
+        Get a session by id, or the latest one; None if it is unknown or evicted.
+        """
+        with self._lock:
+            evicted = self._evict()
+            session = self._sessions.get(session_id or self._latest)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session.id)
+        for old in evicted:
+            self._discard(old)
+        return session
+
+    @property
+    def latest(self) -> Session | None:
+        """
+        The latest configured session, without counting as a use of it.
+        """
+        with self._lock:
+            return self._sessions.get(self._latest)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(session.nbytes for session in self._sessions.values())
+
+    def flush(self) -> None:
+        """
+        Write the persistent sessions through to their files, e.g. at shutdown.
+        """
+        with self._lock:
+            kept = list(self._sessions.values())
+        for session in kept:
+            session.flush()
+
+    def _evict(self, keep: str | None = None) -> list[Session]:
+        now = time.monotonic()
+        evicted = [
+            session for session in self._sessions.values()
+            if now - session.last_used > self.ttl and session.id != keep
+        ]
+        for session in evicted:
+            del self._sessions[session.id]
+
+        total = sum(session.nbytes for session in self._sessions.values())
+        for session in list(self._sessions.values()):
+            if len(self._sessions) <= self.max_sessions and total <= self.memory_budget:
+                break
+            if session.id == keep:
+                continue
+            del self._sessions[session.id]
+            total -= session.nbytes
+            evicted.append(session)
+
+        if self._latest not in self._sessions:
+            self._latest = next(reversed(self._sessions), None)
+        self.evicted += len(evicted)
+        return evicted
+
+    @staticmethod
+    def _discard(session: Session) -> None:
+        session.closed = True
+        session.cancel()
+        session.colored = session.pyramid = None
+        caching.get_ui_cache().forget(session.id)
+        if session.grid.persistent:
+            try:
+                os.remove(session.grid.path)
+            except OSError as e:
+                logger.warning("Could not remove state file of session %s: %s", session.id, e)
+
+    def restore(self) -> None:
+        """
+        Resume the memmap sessions persisted next to the configured state path.
+        """
+        if self.state_path is None:
+            return
+        root, ext = os.path.splitext(self.state_path)
+        paths = glob.glob(f"{glob.escape(root)}-*{ext}")
+        if os.path.exists(self.state_path):
+            paths.append(self.state_path)
+        for path in sorted(paths, key=os.path.getmtime):
+            try:
+                self.add(Session.restore(path))
+            except ValueError as e:
+                logger.warning("Could not resume grid state %s: %s", path, e)
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> SessionStore:
+    """
+    Get the shared session store, created from the home app settings on first use;
+    its persistent sessions are flushed when the process exits, and the hop
+    services are told about the runs it cancels.
+    """
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            config = apps.get_app_config('home')
+            _STORE = SessionStore(
+                config.MAX_SESSIONS,
+                config.SESSION_TTL,
+                config.SESSION_MEMORY_BUDGET,
+                config.GRID_STATE_PATH,
+            )
+            atexit.register(_STORE.flush)
+            CANCELLED.subscribe(notify_hop_services)
+        return _STORE
+
+
+def get_session(session_id: str | None = None) -> Session | None:
+    """
+    Shortcut for `get_store().get(...)`.
+    """
+    return get_store().get(session_id)
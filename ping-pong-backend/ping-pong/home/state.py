@@ -1,8 +1,369 @@
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_right
+
 import numpy as np
+from django.apps import apps
+
+from home.cancellation import CANCELLED
+from home.events import EventBroadcaster
+from home.grids.dense import DenseGrid
+from home.grids.memmap import MemmapGrid
+from home.grids.registry import create_grid
+from home.utils.colors import sequential_colors
+from home.utils.intervals import IntervalSet
+
+DEFAULT_GRID_BACKEND = DenseGrid.name
+# Rough per-entry cost of the Python containers of a session, for the memory budget
+IMAGE_ENTRY_BYTES = 200
+FILL_LOG_ENTRY_BYTES = 150
+LEDGER_ENTRY_BYTES = 70
+
+
+class Session:
+    """
+    State of one generation: its grid, cursor, colors, fill log and lanes.
+
+    Sessions are created by `configure` and kept by `home.sessions`; the
+    generation id doubles as the session id carried by hops and UI requests.
+
+    Writes are serialized by `lock`, and a ledger of the applied index
+    ranges lets a duplicate, retried or out-of-order update be recognized
+    in O(log k) and skipped, so hops and progress batches can be retried
+    and applied from several threads.
+    """
+
+    def __init__(self, m: int, n: int, backend: str | None = None, path: str | None = None,
+                 seed: int | None = None, generation: str | None = None):
+        """
+        Start a new generation on an empty m x n grid.
+
+        Args:
+            m: Grid height (number of rows)
+            n: Grid width (number of columns)
+            backend: Grid storage, "dense" (uint8 per pixel), "bitmap" (1 bit per
+                pixel), "memmap" (bitmap and colors in a file at `path`) or
+                "interval" (merged filled ranges)
+            path: State file of the memmap backend, created or truncated here
+            seed: Seed of the random pixel order, for reproducible runs
+            generation: Session id, a new random one by default
+        """
+        grid = create_grid(backend or DEFAULT_GRID_BACKEND, m, n, path)
+        grid.generation = generation or uuid.uuid4().hex[:12]
+        grid.seed = random.getrandbits(32) if seed is None else seed
+        self._attach(grid)
+
+    @classmethod
+    def restore(cls, path: str) -> "Session":
+        """
+        Resume the generation persisted in a memmap state file.
+
+        The fill log is rebuilt from the filled runs of the grid, so UI clients
+        get a fresh history of the resumed generation.
+        """
+        session = cls.__new__(cls)
+        session._attach(MemmapGrid.open(path))
+
+        if session.random_colors:
+            filled = session.grid.filled_indices()
+            session.image = {int(index): tuple(int(c) for c in session.grid.colors[index]) for index in filled}
+        for start, end in session.grid.filled_ranges():
+            session.ledger.add(start, end)
+            session.record_fill(start, end)
+        return session
+
+    def _attach(self, grid) -> None:
+        self.lock = threading.RLock()
+        # Fill mask of the grid; tracks the filled pixel count for O(1) progress
+        self.grid = grid
+        # Filled index ranges, merged: the ledger of applied updates
+        self.ledger = IntervalSet()
+        self.m = grid.m
+        self.n = grid.n
+        # Seed of the random pixel order
+        self.seed = grid.seed
+        # Id of the configure() call, used to invalidate UI cursors
+        self.generation = grid.generation
+        self.image = {}
+        self.current_x = grid.cursor % max(grid.n, 1)
+        self.current_y = grid.cursor // max(grid.n, 1)
+        # Filled index ranges in fill order: (seq, start, end), where seq counts the
+        # pixels recorded before the range. Contiguous fills are merged in place.
+        self.fill_log = []
+        self.fill_log_seq = []
+        self.fill_seq = 0
+        # Bumped on every write to the image and on lane changes
+        self.version = 0
+        # Disjoint [start, end) index ranges, each generated by its own ping/pong
+        # chain, and the number of filled pixels in each
+        self.set_lanes([(0, self.m * self.n)])
+        # Stream clients of this generation
+        self.broadcaster = EventBroadcaster()
+        # (version, (indices, colors)) of the colored pixels, built by home.colorize
+        self.colored = None
+        # Downsampled image levels for tiles, built by home.pyramid on first use
+        self.pyramid = None
+        # Token of the current ping/pong run, carried by its hops and updates
+        self.token = None
+        self.created = self.last_used = time.monotonic()
+        self.closed = False
+
+    @property
+    def id(self) -> str:
+        return self.generation
+
+    @property
+    def random_colors(self) -> bool:
+        """
+        Whether the grid is filled with random colors, kept in `image`, rather than sequential ones.
+        """
+        return self.m * self.n <= apps.get_app_config('home').RANDOM_MAX_PIXELS
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the session.
+        """
+        return (
+            self.grid.nbytes
+            + len(self.image) * IMAGE_ENTRY_BYTES
+            + len(self.fill_log) * FILL_LOG_ENTRY_BYTES
+            + len(self.ledger) * LEDGER_ENTRY_BYTES
+            + (sum(array.nbytes for array in self.colored[1]) if self.colored is not None else 0)
+            + (self.pyramid.nbytes if self.pyramid is not None else 0)
+        )
+
+    def start_run(self) -> str:
+        """
+        Cancel the current run, if any, and get the token of a new one.
+        """
+        self.cancel()
+        self.token = uuid.uuid4().hex[:12]
+        return self.token
+
+    def cancel(self) -> str | None:
+        """
+        Cancel the current run: its hops and updates are dropped from now on.
+
+        Returns the cancelled token, None if no run was started.
+        """
+        token, self.token = self.token, None
+        CANCELLED.cancel(token)
+        if not self.closed:
+            self.flush()
+        return token
+
+    def flush(self) -> None:
+        """
+        Write a persistent grid, header included, through to its file.
+        """
+        self.grid.flush()
+
+    def accepts(self, token: str | None) -> bool:
+        """
+        Whether an update carrying `token` belongs to the current run; updates
+        without a token, e.g. from older hop services, are always accepted.
+        """
+        return token is None or (token == self.token and not CANCELLED.is_cancelled(token))
+
+    def split_lanes(self, count: int) -> list[tuple[int, int]]:
+        """
+        Split the grid into `count` lanes: row stripes when there are enough
+        rows, otherwise near-equal index ranges.
+        """
+        total_pixels = self.m * self.n
+        count = max(1, min(count, total_pixels))
+        if count <= self.m:
+            bounds = [self.m * lane // count * self.n for lane in range(count + 1)]
+        else:
+            bounds = [total_pixels * lane // count for lane in range(count + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def set_lanes(self, lanes: list[tuple[int, int]]) -> None:
+        """
+        Track completion per lane from now on; lanes must be sorted and disjoint.
+        """
+        with self.lock:
+            self.lanes = list(lanes)
+            self.lane_starts = [start for start, _ in self.lanes]
+            self.lane_filled = [0] * len(self.lanes)
+            if self.grid.count() > 0:
+                self._count_lane_fills(self.grid.filled_ranges())
+            self.version += 1
+
+    def _count_lane_fills(self, runs: list[tuple[int, int]]) -> None:
+        for start, end in runs:
+            lane = max(bisect_right(self.lane_starts, start) - 1, 0)
+            while start < end and lane < len(self.lanes):
+                stop = min(end, self.lanes[lane][1])
+                self.lane_filled[lane] += max(stop - start, 0)
+                start = stop
+                lane += 1
+
+    def lane_resume(self, lane: int) -> tuple[int, int]:
+        """
+        Get where a lane's chain resumes: (seq, next_index), the draw number of
+        the next random pixel and the first unfilled index of the lane.
+        """
+        start, end = self.lanes[lane]
+        filled = self.lane_filled[lane]
+        if filled == 0:
+            return start, start
+        if filled >= end - start:
+            return end, end
+        return start + filled, min(self.ledger.first_missing(start), end)
+
+    def lane_progress(self) -> list[dict]:
+        """
+        Get the filled pixel count and completion of every lane.
+        """
+        return [
+            {"lane": lane, "start": start, "end": end, "filled": filled, "done": filled >= end - start}
+            for lane, ((start, end), filled) in enumerate(zip(self.lanes, self.lane_filled))
+        ]
+
+    def move_cursor(self, index: int) -> None:
+        """
+        Advance the next sequential position to the linear index `index`.
+
+        The cursor never moves back, so late or repeated updates leave it alone.
+        """
+        with self.lock:
+            index = max(index, self.grid.cursor)
+            self.current_x = index % self.n
+            self.current_y = index // self.n
+            self.grid.cursor = index
+
+    def reserve(self, count: int = 1) -> tuple[int, int]:
+        """
+        Atomically take the next `count` sequential positions from the cursor.
+
+        Returns the reserved [start, end) index range, empty once the grid is full.
+        """
+        with self.lock:
+            start = self.grid.cursor
+            end = min(start + count, self.m * self.n)
+            self.move_cursor(end)
+        return start, end
+
+    def record_fill(self, start: int, end: int) -> int:
+        """
+        Append the filled index range [start, end) to the fill log.
+
+        Returns the fill sequence number at which the range was logged.
+        """
+        with self.lock:
+            if end <= start:
+                return self.fill_seq
+            if self.fill_log and self.fill_log[-1][2] == start:
+                seq, first, _ = self.fill_log[-1]
+                self.fill_log[-1] = (seq, first, end)
+            else:
+                self.fill_log.append((self.fill_seq, start, end))
+                self.fill_log_seq.append(self.fill_seq)
+            seq = self.fill_seq
+            self.fill_seq += end - start
+            return seq
+
+    def fills_since(self, seq: int) -> list[tuple[int, int]]:
+        """
+        Get the index ranges recorded after the first `seq` logged pixels.
+
+        Costs O(log k + changes) for a log of k ranges.
+        """
+        position = max(bisect_right(self.fill_log_seq, seq) - 1, 0)
+        ranges = []
+        for entry_seq, start, end in self.fill_log[position:]:
+            first = start + max(seq - entry_seq, 0)
+            if first < end:
+                ranges.append((first, end))
+        return ranges
+
+    def cursor(self) -> str:
+        return f"{self.generation}:{self.fill_seq}"
+
+    def etag(self) -> str:
+        """
+        Entity tag of what /status/ and /ui/ report about the session; it
+        changes with every write, logged fill, cursor move and lane change.
+        """
+        return f'"{self.generation}-{self.version}-{self.fill_seq}-{self.grid.cursor}"'
+
+    def filled_count(self) -> int:
+        return self.grid.count()
+
+    def is_done(self) -> bool:
+        return self.grid.is_full()
+
+    def progress(self) -> dict:
+        """
+        Get the colored pixel count and completion of the generation.
+        """
+        total_pixels = self.m * self.n
+        filled = self.grid.count()
+        return {
+            "session": self.id,
+            "colored_pixels": filled,
+            "total_pixels": total_pixels,
+            "done": self.is_done(),
+            "progress_percentage": (filled / total_pixels * 100) if total_pixels > 0 else 0,
+            "lanes": self.lane_progress(),
+        }
+
+    def fill_range(self, start: int, end: int) -> list[tuple[int, int]]:
+        """
+        Mark the linear index range [start, end) as filled.
+
+        Returns the newly filled sub-ranges, e.g. to log with `record_fill`;
+        pixels that were already filled, or outside the grid, are left out.
+        A range the ledger already covers costs O(log k) and writes nothing.
+        """
+        with self.lock:
+            start, end = self.grid._clamp(start, end)
+            if self.ledger.covers(start, end):
+                return []
+            runs = self.ledger.add(start, end)
+
+            self.grid.set_range(start, end)
+            self.version += 1
+            self._count_lane_fills(runs)
+            if self.pyramid is not None:
+                for run_start, run_end in runs:
+                    self.pyramid.invalidate(run_start, run_end)
+            if self.grid.persistent:
+                for run_start, run_end in runs:
+                    indices = np.arange(run_start, run_end)
+                    self.grid.store_colors(indices, sequential_colors(indices))
+                if self.grid.is_full():
+                    self.flush()
+            return runs
+
+    def fill_pixel(self, index: int) -> bool:
+        """
+        Mark a single pixel as filled; returns False if it already was.
+        """
+        return bool(self.fill_range(index, index + 1))
+
+    def set_pixel_color(self, index: int, color: tuple[int, int, int]) -> bool:
+        """
+        Fill a small-grid pixel and store its color; returns False if it already was filled.
+
+        A filled pixel keeps its color: clients only learn about logged fills,
+        so a recolor would never reach a `since` cursor or a stream.
+        """
+        with self.lock:
+            if not self.ledger.add(index, index + 1):
+                return False
+            self.image[index] = color
+            self.grid.store_colors(index, color)
+            self.grid.set(index)
+            self.version += 1
+            self._count_lane_fills([(index, index + 1)])
+            if self.pyramid is not None:
+                self.pyramid.invalidate(index, index + 1)
+            if self.grid.persistent and self.grid.is_full():
+                self.flush()
+            return True
 
-CURRENT_IMAGE = {}
-CURRENT_IMAGE_NP = np.zeros((0, 0), dtype=np.uint8)
-CURRENT_X = 0
-CURRENT_Y = 0
-GRID_M = 0
-GRID_N = 0
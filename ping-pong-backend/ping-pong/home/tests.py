@@ -0,0 +1,1226 @@
+import gzip
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from unittest import mock
+
+import numpy as np
+import requests
+from django.apps import apps
+from django.test import SimpleTestCase
+from rest_framework.response import Response
+
+from home import caching, colorize, dispatch, events, progress, sessions, transport
+from home.caching import RenderedBodyCache
+from home.cancellation import CANCELLED
+from home.grids.bitmap import BitmapGrid
+from home.grids.dense import DenseGrid
+from home.grids.interval import IntervalGrid
+from home.grids.memmap import MemmapGrid
+from home.image_strategies.large import LargeImageStrategy
+from home.image_strategies.medium import MediumImageStrategy
+from home.image_strategies.planner import BatchPlanner
+from home.image_strategies.registry import get_image_strategy
+from home.image_strategies.small import SmallImageStrategy
+from home.progress import ProgressReporter
+from home.pyramid import ImagePyramid, get_pyramid
+from home.sessions import SessionLimitError, SessionStore
+from home.state import Session
+from home.views import update_pixel
+from home.utils.intervals import IntervalSet
+from home.utils.colors import UniqueColorAllocator, sequential_colors
+from home.utils.permutation import KeyedPermutation
+from home.utils import wire
+from home.utils.raster import PNG_SIGNATURE, RASTER_HEADER, RASTER_MAGIC, downsample
+from home.utils.positions import RandomPositionSampler
+
+
+class RasterEndpointTests(SimpleTestCase):
+    def setUp(self):
+        configured = self.client.post("/api/configure/", {"m": 30, "n": 40, "backend": "dense"}, content_type="application/json")
+        self.session = sessions.get_session(configured.json()["session"])
+        self.session.fill_range(5, 50)
+        self.expected = np.zeros((30 * 40, 4), dtype=np.uint8)
+        self.expected[5:50, :3] = sequential_colors(np.arange(5, 50))
+        self.expected[5:50, 3] = 255
+        self.expected = self.expected.reshape(30, 40, 4)
+
+    def get(self, encoding, **params):
+        response = self.client.get("/api/ui/raster/", {"session": self.session.id, "format": encoding, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.headers["X-Grid-M"], response.headers["X-Grid-N"], response.headers["X-Colored-Pixels"]),
+            ("30", "40", "45"),
+        )
+        return response.content
+
+    def assert_packed(self, body, channels=4):
+        magic, version, header_channels, _, m, n, colored = RASTER_HEADER.unpack_from(body)
+        self.assertEqual((magic, version, header_channels, m, n, colored), (RASTER_MAGIC, 1, channels, 30, 40, 45))
+        raster = np.frombuffer(body[RASTER_HEADER.size:], dtype=np.uint8).reshape(30, 40, channels)
+        np.testing.assert_array_equal(raster, self.expected[..., :channels])
+
+    def test_raw_zlib_and_gzip_bodies(self):
+        self.assert_packed(self.get("raw"))
+        self.assert_packed(self.get("raw", channels=3), channels=3)
+        self.assert_packed(zlib.decompress(self.get("zlib")))
+        self.assert_packed(gzip.decompress(self.get("gzip")))
+
+    def test_png_body(self):
+        body = self.get("png")
+        self.assertTrue(body.startswith(PNG_SIGNATURE))
+        chunks, position = {}, len(PNG_SIGNATURE)
+        while position < len(body):
+            length = int.from_bytes(body[position:position + 4], "big")
+            kind = body[position + 4:position + 8]
+            chunks[kind] = body[position + 8:position + 8 + length]
+            self.assertEqual(
+                int.from_bytes(body[position + 8 + length:position + 12 + length], "big"),
+                zlib.crc32(chunks[kind], zlib.crc32(kind)),
+            )
+            position += 12 + length
+
+        width, height = int.from_bytes(chunks[b"IHDR"][:4], "big"), int.from_bytes(chunks[b"IHDR"][4:8], "big")
+        self.assertEqual((width, height, chunks[b"IHDR"][9]), (40, 30, 6))
+        self.assertEqual(chunks[b"tEXt"], b"colored_pixels\x0045")
+        scanlines = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(30, 1 + 40 * 4)
+        self.assertFalse(scanlines[:, 0].any())
+        np.testing.assert_array_equal(scanlines[:, 1:].reshape(30, 40, 4), self.expected)
+
+    def test_errors_are_json(self):
+        response = self.client.get("/api/ui/raster/", {"session": self.session.id, "format": "png", "channels": 5})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("channels", response.json())
+
+class ImagePageTests(SimpleTestCase):
+    def setUp(self):
+        self.session = Session(10, 10)
+        sessions.get_store().add(self.session)
+        patcher = mock.patch.object(apps.get_app_config("home"), "UI_PAGE_PIXELS", 30)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **params):
+        response = self.client.get("/api/ui/", {"session": self.session.id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_small_images_are_sent_whole(self):
+        self.session.fill_range(0, 30)
+        body = self.get()
+        self.assertEqual(len(body["image"]), 30)
+        self.assertNotIn("next", body)
+
+    def test_large_images_are_paged(self):
+        self.session.fill_range(0, 50)
+        self.session.fill_range(60, 100)
+        pages, start = [], 0
+        while start is not None:
+            page = self.get(**({"start": start} if start else {}))
+            self.assertEqual((page["start"], page["colored_pixels"]), (start, 90))
+            self.assertLessEqual(len(page["image"]), 30)
+            pages.append(page)
+            start = page["next"]
+
+        self.assertEqual([page["next"] for page in pages], [30, 70, None])
+        indices = [pixel["x"] + pixel["y"] * 10 for page in pages for pixel in page["image"]]
+        self.assertEqual(indices, list(range(50)) + list(range(60, 100)))
+        self.assertEqual(
+            [pixel["color"] for page in pages for pixel in page["image"]],
+            sequential_colors(indices).tolist(),
+        )
+        self.assertIsNone(caching.get_ui_cache().get(self.session.id, self.session.etag()))
+        self.assertEqual(self.client.get(pages[0]["raster"]).status_code, 200)
+
+    def test_invalid_start(self):
+        response = self.client.get("/api/ui/", {"session": self.session.id, "start": -1})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImageDeltaTests(SimpleTestCase):
+    def setUp(self):
+        self.session = Session(4, 5)
+        sessions.get_store().add(self.session)
+
+    def delta(self, since):
+        response = self.client.get("/api/ui/", {"session": self.session.id, "since": since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def fill(self, start, end):
+        for run in self.session.fill_range(start, end):
+            self.session.record_fill(*run)
+
+    def test_incremental_delta(self):
+        self.fill(0, 3)
+        first = self.delta(f"{self.session.generation}:0")
+        self.assertEqual((first["reset"], first["ranges"], first["cursor"]), (False, [[0, 3]], f"{self.session.generation}:3"))
+
+        self.fill(7, 9)
+        second = self.delta(first["cursor"])
+        self.assertEqual(second["ranges"], [[7, 9]])
+        self.assertEqual([pixel["x"] + pixel["y"] * 5 for pixel in second["image"]], [7, 8])
+        self.assertEqual(self.delta(second["cursor"])["ranges"], [])
+
+    def test_other_generation_resets(self):
+        self.fill(2, 4)
+        delta = self.delta("0123456789ab:40")
+        self.assertTrue(delta["reset"])
+        self.assertEqual(delta["ranges"], [[2, 4]])
+
+    def test_stale_cursor_resends_later_fills(self):
+        self.fill(0, 2)
+        stale = self.session.cursor()
+        self.fill(2, 6)
+        self.fill(10, 11)
+        delta = self.delta(stale)
+        self.assertEqual(delta["ranges"], [[2, 6], [10, 11]])
+        self.assertEqual(delta["cursor"], f"{self.session.generation}:7")
+
+        response = self.client.get("/api/ui/", {"session": self.session.id, "since": "nonsense"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_range_fills_of_small_grids_get_sequential_colors(self):
+        self.fill(1, 2)
+        self.session.set_pixel_color(3, (9, 9, 9))
+        self.session.record_fill(3, 4)
+        self.assertEqual(
+            self.delta(f"{self.session.generation}:0")["image"],
+            [{"x": 1, "y": 0, "color": [0, 0, 1]}, {"x": 3, "y": 0, "color": [9, 9, 9]}],
+        )
+
+    def test_filled_pixels_keep_their_color(self):
+        self.assertTrue(self.session.set_pixel_color(3, (9, 9, 9)))
+        version = self.session.version
+        self.assertFalse(self.session.set_pixel_color(3, (1, 1, 1)))
+        self.assertEqual((self.session.image[3], self.session.version), ((9, 9, 9), version))
+
+class EventStreamTests(SimpleTestCase):
+    def events(self, frame: bytes) -> list[tuple[str, dict]]:
+        parsed = []
+        for block in frame.decode().strip().split("\n\n"):
+            event, data = block.split("\n")
+            parsed.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return parsed
+
+    def test_push_coalesces_contiguous_ranges(self):
+        subscriber = events.Subscriber("g")
+        subscriber.take()
+        subscriber.push(0, [(0, 2)], [])
+        subscriber.push(2, [(2, 5), (8, 9)], [{"x": 8}])
+        self.assertEqual(subscriber.since, 0)
+        self.assertEqual(subscriber.take(), ([(0, 5), (8, 9)], [{"x": 8}], None))
+
+    def test_overflow_resyncs_from_the_oldest_dropped_range(self):
+        subscriber = events.Subscriber("g")
+        subscriber.take()
+        for seq in range(events.MAX_PENDING_RANGES + 1):
+            subscriber.push(100 + seq, [(seq * 2, seq * 2 + 1)], [])
+        subscriber.push(5000, [(9000, 9001)], [])
+        self.assertEqual(subscriber.take(), ([], [], "g:100"))
+        subscriber.push(5001, [(9001, 9002)], [])
+        self.assertEqual(subscriber.take(), ([(9001, 9002)], [], None))
+
+    def test_stream_starts_with_a_resync_then_sends_pixels(self):
+        session = Session(10, 10)
+        stream = events.stream(session)
+        self.addCleanup(stream.close)
+        self.assertEqual([event for event, _ in self.events(next(stream))], ["resync", "progress"])
+
+        with mock.patch.object(events, "FRAME_INTERVAL", 0):
+            for run in session.fill_range(0, 4):
+                session.broadcaster.publish(session.record_fill(*run), [run])
+            frame = self.events(next(stream))
+        self.assertEqual(frame[0], ("pixels", {"ranges": [[0, 4]], "image": []}))
+        self.assertEqual(frame[1][1]["colored_pixels"], 4)
+
+    def test_eviction_ends_the_stream(self):
+        session = Session(10, 10)
+        stream = events.stream(session)
+        next(stream)
+        session.closed = True
+        session.broadcaster.publish(0, [])
+        with mock.patch.object(events, "FRAME_INTERVAL", 0):
+            self.assertEqual(self.events(next(stream)), [("evicted", {"session": session.id})])
+        with self.assertRaises(StopIteration):
+            next(stream)
+        self.assertEqual(session.broadcaster.subscriber_count, 0)
+
+    def test_endpoint_streams_a_finished_session(self):
+        session = Session(3, 3)
+        session.fill_range(0, 9)
+        sessions.get_store().add(session)
+        response = self.client.get("/api/events/", {"session": session.id}, HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        frame = self.events(b"".join(response.streaming_content))
+        self.assertEqual([event for event, _ in frame], ["resync", "progress", "done"])
+        self.assertEqual(frame[0][1], {"cursor": f"{session.generation}:0"})
+
+class FillRangeTests(SimpleTestCase):
+    def test_applies_ranges_like_per_pixel_writes(self):
+        rng = random.Random(4)
+        for backend in ("dense", "bitmap", "interval"):
+            session = Session(9, 11, backend=backend)
+            expected = set()
+            for _ in range(100):
+                start = rng.randrange(-5, 104)
+                end = start + rng.randrange(0, 15)
+                runs = session.fill_range(start, end)
+                new = set(range(max(start, 0), min(end, 99))) - expected
+                self.assertEqual(sum(run_end - run_start for run_start, run_end in runs), len(new))
+                expected |= new
+            np.testing.assert_array_equal(session.grid.filled_indices(), sorted(expected))
+
+    def test_overlapping_and_duplicate_ranges_fill_once(self):
+        session = Session(4, 4)
+        self.assertEqual(session.fill_range(2, 8), [(2, 8)])
+        self.assertEqual(session.fill_range(2, 8), [])
+        self.assertEqual(session.fill_range(0, 10), [(0, 2), (8, 10)])
+        self.assertEqual(session.grid.filled_indices().tolist(), list(range(10)))
+
+    def test_out_of_bounds_ranges_are_clamped(self):
+        session = Session(2, 3)
+        self.assertEqual(session.fill_range(-4, 2), [(0, 2)])
+        self.assertEqual(session.fill_range(5, 40), [(5, 6)])
+        self.assertEqual(session.fill_range(7, 9), [])
+        self.assertEqual(session.fill_range(4, 1), [])
+        self.assertEqual(session.grid.filled_indices().tolist(), [0, 1, 5])
+
+class FilledCounterTests(SimpleTestCase):
+    def test_counter_follows_writes_without_scanning(self):
+        for backend in ("dense", "bitmap", "interval"):
+            session = Session(6, 7, backend=backend)
+            session.fill_range(3, 20)
+            session.fill_range(10, 30)
+            session.fill_pixel(41)
+            session.fill_pixel(41)
+            with mock.patch.object(type(session.grid), "filled_indices", side_effect=AssertionError("scanned")):
+                self.assertEqual(session.filled_count(), 28)
+                self.assertEqual(session.progress()["colored_pixels"], 28)
+                self.assertFalse(session.is_done())
+            session.fill_range(0, 42)
+            self.assertTrue(session.is_done())
+
+    def test_status_and_metrics_report_the_count(self):
+        session = Session(5, 5)
+        session.fill_range(0, 7)
+        sessions.get_store().add(session)
+
+        status = self.client.get("/api/status/", {"session": session.id}).json()
+        self.assertEqual((status["colored_pixels"], status["total_pixels"]), (7, 25))
+        metrics = self.client.get("/api/metrics/").content.decode().splitlines()
+        self.assertIn("pingpong_filled_pixels 7", metrics)
+        self.assertIn("pingpong_total_pixels 25", metrics)
+
+class ImageStrategyTests(SimpleTestCase):
+    def test_default_random_bound(self):
+        self.assertIsInstance(get_image_strategy(784), SmallImageStrategy)
+        self.assertIsInstance(get_image_strategy(785), MediumImageStrategy)
+        self.assertIsInstance(get_image_strategy(10_001), LargeImageStrategy)
+        self.assertFalse(Session(28, 29).random_colors)
+
+    def test_configurable_random_bound(self):
+        with mock.patch.object(apps.get_app_config("home"), "RANDOM_MAX_PIXELS", 2500):
+            self.assertIsInstance(get_image_strategy(2500), SmallImageStrategy)
+            self.assertIsInstance(get_image_strategy(2501), MediumImageStrategy)
+            session = Session(50, 50)
+            self.assertTrue(session.random_colors)
+            session.set_pixel_color(2499, (1, 2, 3))
+            session.record_fill(2499, 2500)
+            self.assertEqual(colorize.rgb_raster(session, 3)[49, 49].tolist(), [1, 2, 3])
+
+
+class ColoredPixelsTests(SimpleTestCase):
+    @staticmethod
+    def per_pixel_color(index):
+        return [(index // (256 * 256)) % 256, (index // 256) % 256, index % 256]
+
+    def test_matches_per_pixel_colors(self):
+        session = Session(120, 150)
+        session.fill_range(7, 900)
+        session.fill_range(17_000, 17_999)
+        indices, colors = colorize.colored_pixels(session)
+        self.assertEqual(indices.tolist(), list(range(7, 900)) + list(range(17_000, 17_999)))
+        self.assertEqual(colors.tolist(), [self.per_pixel_color(index) for index in indices.tolist()])
+
+    def test_small_grids_keep_random_colors(self):
+        session = Session(4, 5)
+        session.fill_range(2, 4)
+        session.set_pixel_color(9, (7, 8, 9))
+        session.set_pixel_color(0, (1, 1, 1))
+        indices, colors = colorize.colored_pixels(session)
+        self.assertEqual(indices.tolist(), [0, 2, 3, 9])
+        self.assertEqual(colors.tolist(), [[1, 1, 1], self.per_pixel_color(2), self.per_pixel_color(3), [7, 8, 9]])
+
+    def test_cached_on_the_session_until_the_next_write(self):
+        session = Session(30, 40)
+        session.fill_range(0, 100)
+        before = session.nbytes
+        first = colorize.colored_pixels(session)
+        self.assertIs(colorize.colored_pixels(session), first)
+        self.assertEqual(session.nbytes, before + first[0].nbytes + first[1].nbytes)
+
+        other = Session(30, 40)
+        other.fill_range(0, 3)
+        self.assertEqual(len(colorize.colored_pixels(other)[0]), 3)
+        self.assertIs(colorize.colored_pixels(session), first)
+
+        session.fill_range(100, 101)
+        self.assertEqual(len(colorize.colored_pixels(session)[0]), 101)
+
+    def test_dropped_on_eviction(self):
+        store = SessionStore(max_sessions=1, ttl=60, memory_budget=1 << 20)
+        session = store.create(30, 40)
+        session.fill_range(0, 100)
+        colorize.colored_pixels(session)
+        store.create(3, 3)
+        self.assertIsNone(session.colored)
+        colorize.colored_pixels(session)
+        self.assertIsNone(session.colored)
+
+
+class BitmapGridTests(SimpleTestCase):
+    def test_matches_dense_grid_on_random_ranges(self):
+        rng = random.Random(6)
+        for m, n in [(1, 1), (3, 5), (7, 13), (64, 64)]:
+            dense = DenseGrid(m, n)
+            bitmap = BitmapGrid(m, n)
+            for _ in range(200):
+                start = rng.randrange(-3, dense.size + 3)
+                end = start + rng.randrange(0, 20)
+                self.assertEqual(bitmap.set_range(start, end), dense.set_range(start, end))
+                self.assertEqual(bitmap.count(), dense.count())
+
+            self.assertEqual(bitmap.is_full(), dense.is_full())
+            np.testing.assert_array_equal(bitmap.filled_indices(), dense.filled_indices())
+            np.testing.assert_array_equal(bitmap.unfilled_indices(), dense.unfilled_indices())
+            np.testing.assert_array_equal(bitmap.mask(), dense.mask())
+            for index in range(dense.size):
+                self.assertEqual(bitmap.test(index), dense.test(index))
+
+    def test_unfilled_indices_of_a_subrange(self):
+        bitmap = BitmapGrid(4, 4)
+        bitmap.set_range(3, 9)
+        np.testing.assert_array_equal(bitmap.unfilled_indices(1, 11), [1, 2, 9, 10])
+
+    def test_set_reports_new_pixels_only(self):
+        bitmap = BitmapGrid(2, 3)
+        self.assertTrue(bitmap.set(4))
+        self.assertFalse(bitmap.set(4))
+        self.assertEqual(bitmap.set_range(0, 6), 5)
+        self.assertTrue(bitmap.is_full())
+
+
+class IntervalGridTests(SimpleTestCase):
+    def test_matches_dense_grid_on_random_ranges(self):
+        rng = random.Random(22)
+        for m, n in [(1, 1), (3, 5), (7, 13), (64, 64)]:
+            dense = DenseGrid(m, n)
+            grid = IntervalGrid(m, n)
+            for _ in range(200):
+                start = rng.randrange(-3, dense.size + 3)
+                end = start + rng.randrange(0, 20)
+                self.assertEqual(grid.set_range(start, end), dense.set_range(start, end))
+                self.assertEqual(grid.count(), dense.count())
+
+                low = rng.randrange(0, dense.size + 1)
+                high = rng.randrange(low, dense.size + 1)
+                np.testing.assert_array_equal(grid.unfilled_indices(low, high), dense.unfilled_indices(low, high))
+
+            self.assertEqual(grid.is_full(), dense.is_full())
+            self.assertEqual(grid.filled_ranges(), dense.filled_ranges())
+            np.testing.assert_array_equal(grid.filled_indices(), dense.filled_indices())
+            np.testing.assert_array_equal(grid.mask(), dense.mask())
+            for index in range(dense.size):
+                self.assertEqual(grid.test(index), dense.test(index))
+
+    def test_sequential_fill_stays_one_interval(self):
+        grid = IntervalGrid(10_000, 10_000)
+        for start in range(0, 1_000_000, 1000):
+            grid.set_range(start, start + 1000)
+        self.assertEqual(grid.filled_ranges(), [(0, 1_000_000)])
+        self.assertEqual(grid.count(), 1_000_000)
+        self.assertLess(grid.nbytes, 100)
+
+    def test_set_lanes_counts_existing_fills(self):
+        session = Session(4, 4, backend="interval")
+        session.fill_range(2, 6)
+        session.fill_range(9, 12)
+        session.set_lanes(session.split_lanes(2))
+        self.assertEqual(session.lane_filled, [4, 3])
+
+
+class MemmapGridTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "grid.mmap")
+
+    def test_header_persists_across_open(self):
+        grid = MemmapGrid(3, 4, self.path)
+        grid.set_range(2, 7)
+        grid.cursor = 7
+        grid.generation = "abc123"
+        grid.seed = 42
+        grid.store_colors(np.arange(2, 7), sequential_colors(np.arange(2, 7)))
+        grid.flush()
+
+        reopened = MemmapGrid.open(self.path, readonly=True)
+        self.assertEqual((reopened.m, reopened.n), (3, 4))
+        self.assertEqual(reopened.count(), 5)
+        self.assertEqual(reopened.cursor, 7)
+        self.assertEqual(reopened.generation, "abc123")
+        self.assertEqual(reopened.seed, 42)
+        np.testing.assert_array_equal(reopened.filled_indices(), np.arange(2, 7))
+        np.testing.assert_array_equal(reopened.colors[2:7], sequential_colors(np.arange(2, 7)))
+
+    def test_open_rejects_other_files(self):
+        with open(self.path, "wb") as file:
+            file.write(b"\0" * 128)
+        with self.assertRaises(ValueError):
+            MemmapGrid.open(self.path)
+
+    def test_session_restore_resumes_generation(self):
+        session = Session(4, 5, backend="memmap", path=self.path, seed=7)
+        for start, end in session.fill_range(0, 6) + session.fill_range(10, 12):
+            session.record_fill(start, end)
+        session.move_cursor(12)
+        session.grid.flush()
+
+        restored = Session.restore(self.path)
+        self.assertEqual((restored.m, restored.n), (4, 5))
+        self.assertEqual((restored.current_x, restored.current_y), (2, 2))
+        self.assertEqual(restored.generation, session.generation)
+        self.assertEqual(restored.seed, 7)
+        self.assertEqual(restored.filled_count(), 8)
+        self.assertEqual(restored.fill_log, session.fill_log)
+        # Small grids get their colors back from the file
+        self.assertEqual(restored.image[11], (0, 0, 11))
+
+    def test_counts_only_resident_memory(self):
+        grid = MemmapGrid(100, 100, self.path)
+        self.assertLess(grid.nbytes, 1400)
+        self.assertGreater(os.path.getsize(self.path), 30_000)
+
+    def test_flushes_on_completion_and_cancel(self):
+        session = Session(2, 3, backend="memmap", path=self.path)
+        with mock.patch.object(session.grid, "flush") as flush:
+            session.fill_range(0, 5)
+            flush.assert_not_called()
+            session.fill_range(5, 6)
+            self.assertEqual(flush.call_count, 1)
+            session.start_run()
+            session.cancel()
+            self.assertEqual(flush.call_count, 3)
+
+            store = SessionStore(4, 60, 1 << 20)
+            store.add(session)
+            store.flush()
+            self.assertEqual(flush.call_count, 4)
+
+
+class KeyedPermutationTests(SimpleTestCase):
+    def test_is_a_bijection(self):
+        for size in [1, 2, 3, 17, 100, 784, 1000, 4097]:
+            permutation = KeyedPermutation(size, key=size)
+            values = permutation.permute(np.arange(size))
+            np.testing.assert_array_equal(np.sort(values), np.arange(size))
+
+    def test_scalar_and_vector_paths_agree(self):
+        for size, key in [(5, 1), (784, 2), (1000, 3), (1 << 24, 4)]:
+            permutation = KeyedPermutation(size, key)
+            positions = np.unique(np.linspace(0, size - 1, 300).astype(np.int64))
+            expected = permutation.permute(positions)
+            self.assertEqual([permutation(int(p)) for p in positions], expected.tolist())
+
+    def test_depends_on_key(self):
+        first = KeyedPermutation(1000, key=1).permute(np.arange(1000))
+        second = KeyedPermutation(1000, key=2).permute(np.arange(1000))
+        self.assertFalse(np.array_equal(first, second))
+
+    def test_rejects_out_of_range_positions(self):
+        permutation = KeyedPermutation(10, key=0)
+        with self.assertRaises(IndexError):
+            permutation(10)
+        with self.assertRaises(IndexError):
+            permutation.permute([3, 10])
+        with self.assertRaises(ValueError):
+            KeyedPermutation(0, key=0)
+
+    def test_position_sampler_visits_every_pixel_once(self):
+        sampler = RandomPositionSampler(7, 9, seed=3)
+        positions = {sampler.draw(cursor) for cursor in range(63)}
+        self.assertEqual(positions, {(x, y) for x in range(9) for y in range(7)})
+
+    def test_lane_sampler_stays_in_its_range(self):
+        sampler = RandomPositionSampler(7, 9, seed=3, start=20, end=45)
+        xs, ys = sampler.draws(20, 25)
+        self.assertEqual(sorted((ys * 9 + xs).tolist()), list(range(20, 45)))
+
+
+class UniqueColorAllocatorTests(SimpleTestCase):
+    def test_allocations_are_unique(self):
+        allocator = UniqueColorAllocator(key=9)
+        colors = np.concatenate([allocator.allocate(50_000), allocator.allocate(50_000)])
+        packed = (colors[:, 0].astype(np.int64) << 16) | (colors[:, 1].astype(np.int64) << 8) | colors[:, 2]
+        self.assertEqual(len(np.unique(packed)), 100_000)
+
+    def test_scalar_and_vector_colors_agree(self):
+        allocator = UniqueColorAllocator(key=9)
+        sequences = np.arange(0, 1000, 7)
+        self.assertEqual([list(allocator.color(int(s))) for s in sequences], allocator.colors(sequences).tolist())
+        np.testing.assert_array_equal(allocator.allocate(1000)[sequences], allocator.colors(sequences))
+
+    def test_small_image_colors_are_unique(self):
+        allocator = UniqueColorAllocator(key=1)
+        colors = {allocator.color(sequence) for sequence in range(784)}
+        self.assertEqual(len(colors), 784)
+
+
+class ProgressReporterTests(SimpleTestCase):
+    def _reporter(self, **kwargs):
+        options = {"batch_size": 512, "flush_interval": 0.01, "max_buffer": 1000, "timeout": 1, "max_retries": 3}
+        return ProgressReporter("http://main/api/status/update_pixel/", **{**options, **kwargs})
+
+    def test_merges_contiguous_ranges_into_one_batch(self):
+        reporter = self._reporter()
+        with mock.patch("home.http_client.post_payload") as post:
+            for index in range(100):
+                reporter.add_range(index, index + 1)
+            reporter.add_pixel(3, 4, (1, 2, 3))
+            self.assertTrue(reporter.flush(timeout=5))
+
+        batches = [call.args[1] for call in post.call_args_list]
+        self.assertEqual([r for batch in batches for r in batch["ranges"].tolist()], [[0, 100]])
+        self.assertEqual([p for batch in batches for p in batch["pixel_xy"].tolist()], [[3, 4]])
+        self.assertEqual([c for batch in batches for c in batch["pixel_colors"].tolist()], [[1, 2, 3]])
+        self.assertEqual(reporter.pending, 0)
+
+    def test_retries_failed_batches(self):
+        reporter = self._reporter()
+        ok = mock.Mock(**{"raise_for_status.return_value": None})
+        with mock.patch("home.http_client.post_payload", side_effect=[requests.ConnectionError(), ok]) as post:
+            reporter.add_range(0, 10)
+            self.assertTrue(reporter.flush(timeout=5))
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(reporter.failures, 1)
+        self.assertEqual(reporter.sent, 1)
+
+    def test_waits_for_room_past_the_buffer(self):
+        reporter = self._reporter(batch_size=2, max_buffer=3)
+        release = threading.Event()
+        with mock.patch("home.http_client.post_payload", side_effect=lambda *args, **kwargs: release.wait(5) and mock.Mock()) as post:
+            adder = threading.Thread(target=lambda: [reporter.add_range(index, index + 1) for index in range(0, 20, 2)])
+            adder.start()
+            adder.join(0.2)
+            self.assertTrue(adder.is_alive())
+            self.assertLessEqual(len(reporter.ranges), 3)
+
+            release.set()
+            adder.join(5)
+            self.assertTrue(reporter.flush(timeout=5))
+
+        sent = [r for call in post.call_args_list for r in call.args[1]["ranges"].tolist()]
+        self.assertEqual(sent, [[index, index + 1] for index in range(0, 20, 2)])
+        self.assertEqual(reporter.dropped, 0)
+
+    def test_gives_up_after_the_retries(self):
+        reporter = self._reporter(max_retries=2)
+        unavailable = requests.HTTPError(response=mock.Mock(status_code=503))
+        with mock.patch("home.http_client.post_payload", side_effect=unavailable) as post, \
+                self.assertLogs("home.progress", level="ERROR"):
+            reporter.add_range(0, 10)
+            self.assertTrue(reporter.flush(timeout=5))
+            reporter.add_pixel(1, 2, (3, 4, 5))
+
+        self.assertEqual(post.call_count, 3)
+        self.assertTrue(reporter.failed)
+        self.assertEqual((reporter.failures, reporter.dropped, reporter.pending), (3, 2, 0))
+
+
+class WireFormatTests(SimpleTestCase):
+    def test_round_trip(self):
+        payload = {
+            "m": 3,
+            "seed": 1 << 40,
+            "generation": "abc",
+            "done": False,
+            "progress": 0.5,
+            "cursor": None,
+            "pixel": {"x": 1, "y": 2, "color": [1, 2, 3]},
+            "ranges": np.array([[0, 5], [7, 9]], dtype=np.int64),
+            "pixel_colors": np.zeros((0, 3), dtype=np.uint8),
+        }
+        decoded = wire.decode(wire.encode(payload))
+
+        self.assertEqual(decoded.keys(), payload.keys())
+        for key in ("m", "seed", "generation", "done", "progress", "cursor"):
+            self.assertEqual(decoded[key], payload[key])
+        self.assertEqual(decoded["pixel"]["color"].tolist(), [1, 2, 3])
+        np.testing.assert_array_equal(decoded["ranges"], payload["ranges"])
+        self.assertEqual(decoded["pixel_colors"].shape, (0, 3))
+        self.assertEqual(decoded["pixel_colors"].dtype, np.uint8)
+
+    def test_rejects_malformed_payloads(self):
+        body = wire.encode({"ranges": np.arange(4)})
+        for bad in (body[:-1], body + b"\0", b"JSON" + body[4:]):
+            with self.assertRaises(ValueError):
+                wire.decode(bad)
+        with self.assertRaises(TypeError):
+            wire.encode({"pixels": [{"x": 1}]})
+
+
+class BatchPlannerTests(SimpleTestCase):
+    def test_grows_geometrically_until_costs_are_known(self):
+        planner = BatchPlanner(target=0.05, min_batch=1, max_batch=100)
+        self.assertEqual([planner.batch_size() for _ in range(5)], [4, 16, 64, 100, 100])
+
+    def test_sizes_batches_to_the_target_duration(self):
+        planner = BatchPlanner(target=0.05, min_batch=1, max_batch=10_000_000)
+        planner.last_batch = 1_000_000
+        planner.observe_hop(0.01)
+        planner.observe_pixels(1000, 0.01 + 1000 * 1e-6)
+        # (0.05 - 0.01) / 1e-6 pixels
+        self.assertAlmostEqual(planner.batch_size(), 40_000, delta=1)
+        self.assertEqual(planner.batch_size(remaining=7), 7)
+
+    def test_slow_hops_keep_growing_batches(self):
+        planner = BatchPlanner(target=0.05, min_batch=2, max_batch=1000)
+        planner.observe_hop(0.2)
+        planner.observe_pixels(10, 0.3)
+        self.assertEqual(planner.batch_size(), 8)
+
+
+class SmallImageHopTests(SimpleTestCase):
+    def test_hops_carry_only_new_pixels(self):
+        import ping.views
+
+        session = Session(6, 7)
+        sessions.get_store().add(session)
+        token = session.start_run()
+        payload = {"session": session.id, "token": token, "m": 6, "n": 7, "seed": 1234}
+        hops = []
+        with mock.patch("home.dispatch.forward", side_effect=lambda url, forwarded: hops.append(forwarded)), \
+                mock.patch.object(SmallImageStrategy, "plan_batch", side_effect=lambda remaining: min(5, remaining)):
+            while ping.views.hop(transport.LoopbackRequest(payload)).data["status"] != "done":
+                payload = hops[-1]
+        self.assertTrue(progress.get_reporter(session.id, token).flush(timeout=5))
+
+        self.assertEqual([hop["seq"] for hop in hops], [5, 10, 15, 20, 25, 30, 35, 40, 42])
+        for previous, hop in zip([0] + [hop["seq"] for hop in hops], hops):
+            self.assertNotIn("image", hop)
+            self.assertEqual(len(hop["pixel_xy"]), hop["seq"] - previous)
+            self.assertEqual(len(hop["pixel_colors"]), hop["seq"] - previous)
+
+        # The main service rebuilt the whole image from the hops' new pixels
+        self.assertTrue(session.is_done())
+        sent = {
+            y * 7 + x: tuple(color)
+            for hop in hops for (x, y), color in zip(hop["pixel_xy"].tolist(), hop["pixel_colors"].tolist())
+        }
+        self.assertEqual(session.image, sent)
+        self.assertEqual(len(set(session.image.values())), 42)
+
+
+class LaneTests(SimpleTestCase):
+    def setUp(self):
+        self.session = Session(10, 4)
+
+    def test_splits_rows_then_indices(self):
+        self.assertEqual(self.session.split_lanes(3), [(0, 12), (12, 24), (24, 40)])
+        lanes = self.session.split_lanes(16)
+        self.assertEqual(len(lanes), 16)
+        self.assertEqual((lanes[0][0], lanes[-1][1]), (0, 40))
+        self.assertTrue(all(start < end for start, end in lanes))
+
+    def test_tracks_fills_per_lane(self):
+        session = self.session
+        session.fill_range(0, 5)
+        session.set_lanes(session.split_lanes(2))
+        session.fill_range(18, 25)
+        session.set_pixel_color(39, (1, 2, 3))
+        self.assertEqual([lane["filled"] for lane in session.lane_progress()], [7, 6])
+        self.assertEqual(session.lane_resume(0), (7, 5))
+        self.assertEqual(session.lane_resume(1), (26, 25))
+
+        session.fill_range(0, 40)
+        self.assertTrue(all(lane["done"] for lane in session.lane_progress()))
+        self.assertEqual(session.lane_resume(1), (40, 40))
+
+
+class SessionStoreTests(SimpleTestCase):
+    def test_sessions_are_independent(self):
+        store = SessionStore(max_sessions=4, ttl=60, memory_budget=1 << 20)
+        first = store.create(3, 3)
+        second = store.create(2, 2)
+        first.fill_range(0, 9)
+
+        self.assertIs(store.get(), second)
+        self.assertIs(store.get(first.id), first)
+        self.assertTrue(first.is_done())
+        self.assertEqual(second.filled_count(), 0)
+
+    def test_evicts_least_recently_used_sessions(self):
+        store = SessionStore(max_sessions=2, ttl=60, memory_budget=1 << 20)
+        first, second = store.create(3, 3), store.create(3, 3)
+        store.get(first.id)
+        third = store.create(3, 3)
+
+        self.assertIsNone(store.get(second.id))
+        self.assertTrue(second.closed)
+        self.assertIs(store.get(first.id), first)
+        self.assertEqual(store.evicted, 1)
+        self.assertIs(store.latest, third)
+
+    def test_evicts_idle_sessions_and_enforces_the_memory_budget(self):
+        store = SessionStore(max_sessions=8, ttl=60, memory_budget=150)
+        idle = store.create(10, 10)
+        idle.last_used -= 61
+        self.assertIsNone(store.get(idle.id))
+
+        first = store.create(10, 10)
+        store.create(10, 10)
+        self.assertIsNone(store.get(first.id))
+        with self.assertRaises(SessionLimitError):
+            store.create(20, 20)
+
+
+class TransportTests(SimpleTestCase):
+    URL = "http://localhost:8000/api/status/update_pixel/"
+
+    def test_serves_loopback_hosts_in_process(self):
+        import ping.views
+
+        local = transport.Transport("auto")
+        self.assertIs(local.handler("http://localhost:8000/api/ping/"), ping.views.hop)
+        self.assertIsNone(local.handler("http://main:8000/api/ping/"))
+        self.assertIsNone(local.handler("http://localhost:8000/api/missing/"))
+        self.assertIs(local.handler("http://127.0.0.1:8000/api/ping/"), ping.views.hop)
+        self.assertIsNone(local.handler("http://localhost:8001/api/ping/"))
+        self.assertIsNone(local.handler("http://localhost/api/ping/"))
+
+        behind_proxy = transport.Transport("auto", "https://pingpong.example")
+        self.assertIs(behind_proxy.handler("https://pingpong.example/api/ping/"), ping.views.hop)
+        self.assertIsNone(behind_proxy.handler("http://localhost:8000/api/ping/"))
+        self.assertIs(transport.Transport("loopback").handler("http://main:8000/api/ping/"), ping.views.hop)
+        self.assertIsNone(transport.Transport("http").handler("http://localhost:8000/api/ping/"))
+
+    def test_nested_sends_run_after_the_handler_returns(self):
+        local = transport.Transport("auto")
+        depth, calls = [0], []
+
+        def handler(request):
+            depth[0] += 1
+            calls.append((request.data["hop"], depth[0]))
+            if request.data["hop"] < 3:
+                local.send(self.URL, {"hop": request.data["hop"] + 1})
+            depth[0] -= 1
+            return Response({"hop": request.data["hop"]})
+
+        with mock.patch.dict(transport._HANDLERS, {update_pixel: handler}):
+            response = local.send(self.URL, {"hop": 0})
+
+        self.assertEqual(response.json(), {"hop": 0})
+        self.assertEqual(calls, [(0, 1), (1, 1), (2, 1), (3, 1)])
+        self.assertEqual(local.local_requests, 4)
+
+    def test_handler_errors_become_error_responses(self):
+        local = transport.Transport("auto")
+        with mock.patch.dict(transport._HANDLERS, {update_pixel: mock.Mock(side_effect=KeyError("m"))}):
+            response = local.send(self.URL, {})
+        self.assertEqual(response.status_code, 500)
+        with self.assertRaises(requests.HTTPError):
+            response.raise_for_status()
+
+
+class CancellationTests(SimpleTestCase):
+    def test_a_new_run_cancels_the_previous_one(self):
+        session = Session(4, 4)
+        first = session.start_run()
+        self.assertTrue(session.accepts(first))
+        second = session.start_run()
+
+        self.assertTrue(CANCELLED.is_cancelled(first))
+        self.assertFalse(session.accepts(first))
+        self.assertTrue(session.accepts(second))
+        self.assertTrue(session.accepts(None))
+        self.assertEqual(session.cancel(), second)
+        self.assertFalse(session.accepts(second))
+
+    def test_hops_of_a_cancelled_run_end_the_chain(self):
+        import ping.views
+
+        token = Session(4, 4).start_run()
+        CANCELLED.cancel(token)
+        with mock.patch("home.dispatch.forward") as forward:
+            response = ping.views.hop(transport.LoopbackRequest({"m": 4, "n": 4, "token": token}))
+
+        self.assertEqual(response.data, {"status": "cancelled"})
+        forward.assert_not_called()
+
+    def test_reporter_drops_the_run_on_conflict(self):
+        reporter = ProgressReporter(
+            "http://main/api/status/update_pixel/", batch_size=2, flush_interval=0.01,
+            max_buffer=1000, timeout=1, max_retries=3, token="conflicted",
+        )
+        conflict = requests.HTTPError(response=mock.Mock(status_code=409))
+        with mock.patch("home.http_client.post_payload", side_effect=conflict) as post:
+            for index in range(0, 20, 2):
+                reporter.add_range(index, index + 1)
+            self.assertTrue(reporter.flush(timeout=5))
+
+        self.assertTrue(CANCELLED.is_cancelled("conflicted"))
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(reporter.dropped, 10)
+
+
+class HopDispatcherTests(SimpleTestCase):
+    def test_sync_mode_posts_before_returning(self):
+        calls = []
+        with mock.patch("home.transport.send", side_effect=lambda url, payload: calls.append(payload["seq"])):
+            dispatcher = dispatch.HopDispatcher("sync", workers=1)
+            for seq in range(3):
+                dispatcher.forward("http://pong/", {"seq": seq})
+                self.assertEqual(calls, list(range(seq + 1)))
+
+    def test_async_mode_returns_first_and_posts_in_order(self):
+        release, calls = threading.Event(), []
+
+        def send(url, payload):
+            release.wait(5)
+            calls.append(payload["seq"])
+            return mock.Mock()
+
+        dispatcher = dispatch.HopDispatcher("async", workers=1)
+        with mock.patch("home.transport.send", side_effect=send):
+            for seq in range(3):
+                dispatcher.forward("http://pong/", {"seq": seq})
+            self.assertEqual((calls, dispatcher.pending), ([], 3))
+            release.set()
+            dispatcher._executor.shutdown(wait=True)
+
+        self.assertEqual((calls, dispatcher.pending), ([0, 1, 2], 0))
+
+    def test_queued_hops_of_a_cancelled_run_are_dropped(self):
+        release, calls = threading.Event(), []
+
+        def send(url, payload):
+            release.wait(5)
+            calls.append(payload["token"])
+            return mock.Mock()
+
+        dispatcher = dispatch.HopDispatcher("async", workers=1)
+        dropped = CANCELLED.dropped
+        with mock.patch("home.transport.send", side_effect=send):
+            dispatcher.forward("http://pong/", {"token": "running"})
+            dispatcher.forward("http://pong/", {"token": "queued"})
+            dispatcher.forward("http://pong/", {"token": "running"})
+            CANCELLED.cancel("queued")
+            release.set()
+            dispatcher._executor.shutdown(wait=True)
+
+        self.assertEqual(calls, ["running", "running"])
+        self.assertEqual(CANCELLED.dropped, dropped + 1)
+
+    def test_unexpected_errors_are_logged(self):
+        dispatcher = dispatch.HopDispatcher("async", workers=1)
+        with mock.patch("home.transport.send", side_effect=KeyError("m")), \
+                self.assertLogs("home.dispatch", level="ERROR") as logs:
+            dispatcher.forward("http://pong/", {})
+            dispatcher._executor.shutdown(wait=True)
+
+        self.assertIn("Unexpected error forwarding hop to http://pong/", logs.output[0])
+        self.assertEqual(dispatcher.pending, 0)
+
+
+class IntervalSetTests(SimpleTestCase):
+    def test_matches_a_set_of_integers(self):
+        rng = random.Random(21)
+        intervals, expected = IntervalSet(), set()
+        for _ in range(500):
+            start = rng.randrange(0, 200)
+            end = start + rng.randrange(0, 15)
+            gaps = intervals.add(start, end)
+
+            self.assertEqual({i for gap in gaps for i in range(*gap)}, set(range(start, end)) - expected)
+            expected.update(range(start, end))
+            self.assertEqual({i for interval in intervals for i in range(*interval)}, expected)
+            self.assertTrue(all(e < s for (_, e), (s, _) in zip(intervals, list(intervals)[1:])))
+
+        probe = rng.randrange(0, 200)
+        self.assertEqual(probe in intervals, probe in expected)
+        self.assertEqual(intervals.total, len(expected))
+        self.assertEqual(intervals.first_missing(0), min(set(range(300)) - expected))
+
+    def test_covers(self):
+        intervals = IntervalSet([(0, 5), (5, 8), (10, 12)])
+        self.assertEqual(list(intervals), [(0, 8), (10, 12)])
+        self.assertTrue(intervals.covers(2, 8))
+        self.assertFalse(intervals.covers(7, 11))
+        self.assertTrue(intervals.covers(9, 9))
+
+    def test_take(self):
+        intervals = IntervalSet([(0, 8), (10, 12), (20, 30)])
+        self.assertEqual(intervals.take(3, 7), [(3, 8), (10, 12)])
+        self.assertEqual(intervals.take(9, 100), [(10, 12), (20, 30)])
+        self.assertEqual(intervals.take(30, 5), [])
+        self.assertEqual(intervals.take(0, 0), [])
+
+
+class ConcurrentUpdateTests(SimpleTestCase):
+    def test_overlapping_and_repeated_updates_from_threads(self):
+        session = Session(100, 100)
+        rng = random.Random(5)
+        ranges = [(start, start + rng.randrange(97, 300)) for start in range(0, 10_000, 97)] * 3
+        rng.shuffle(ranges)
+
+        def apply(chunk):
+            for start, end in chunk:
+                for run in session.fill_range(start, end):
+                    session.record_fill(*run)
+                session.move_cursor(end)
+
+        threads = [threading.Thread(target=apply, args=(ranges[i::8],)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(session.is_done())
+        self.assertEqual(session.fill_seq, 10_000)
+        self.assertEqual(list(session.ledger), [(0, 10_000)])
+        self.assertEqual(session.grid.cursor, max(end for _, end in ranges))
+
+    def test_reservations_never_overlap(self):
+        session = Session(10, 10)
+        reserved = []
+
+        def reserve():
+            for _ in range(30):
+                reserved.append(session.reserve())
+
+        threads = [threading.Thread(target=reserve) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        taken = [start for start, end in reserved if end > start]
+        self.assertEqual(sorted(taken), list(range(100)))
+
+
+class HopProfileTests(SimpleTestCase):
+    def test_hop_settings_serve_hops_without_the_main_service(self):
+        script = (
+            "import sys, django\n"
+            "django.setup()\n"
+            "from django.test import Client\n"
+            "response = Client().post('/api/ping/', {'m': 0, 'n': 0}, content_type='application/json')\n"
+            "assert response.status_code == 200, response.status_code\n"
+            "assert Client().get('/api/status/').status_code == 404\n"
+            "loaded = [name for name in ('home.state', 'home.views', 'home.sessions', 'home.events') if name in sys.modules]\n"
+            "assert not loaded, loaded\n"
+        )
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE="configs.settings_hop")
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=environment, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class ServiceUrlTests(SimpleTestCase):
+    URLS = {"PING_URL": "http://ping:8000/api", "PONG_URL": "http://pong:8000/api", "PROGRESS_URL": "http://backend:8000/api"}
+
+    def setUp(self):
+        config = apps.get_app_config("home")
+        for name, url in self.URLS.items():
+            patcher = mock.patch.object(config, name, url)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_hops_go_to_the_other_hop_service(self):
+        import ping.views
+        import pong.views
+
+        with mock.patch("home.dispatch.forward") as forward:
+            ping.views.hop(transport.LoopbackRequest({"m": 100, "n": 100, "session": "routing", "token": "ping"}))
+            pong.views.hop(transport.LoopbackRequest({"m": 100, "n": 100, "session": "routing", "token": "pong"}))
+
+        self.assertEqual([call.args[0] for call in forward.call_args_list], [
+            "http://pong:8000/api/pong/", "http://ping:8000/api/ping/",
+        ])
+        reporter = progress.get_reporter("routing", "ping")
+        self.assertEqual(reporter.url, "http://backend:8000/api/status/update_pixel/")
+        CANCELLED.cancel("ping")
+        CANCELLED.cancel("pong")
+
+    def test_generate_starts_the_chains_at_ping(self):
+        session = Session(4, 4)
+        sessions.get_store().add(session)
+        with mock.patch("home.transport.send") as send:
+            response = self.client.post("/api/generate/", {"session": session.id, "lanes": 2}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([call.args[0] for call in send.call_args_list], ["http://ping:8000/api/ping/"] * 2)
+        session.cancel()
+
+
+class HopServiceCancellationTests(SimpleTestCase):
+    """
+    Cancels a run in the main service while its hop service runs in another process.
+    """
+
+    def setUp(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/api"
+        service = subprocess.Popen(
+            [sys.executable, "manage.py", "runserver", "--noreload", f"127.0.0.1:{port}"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE="configs.settings_hop"),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        self.addCleanup(service.wait)
+        self.addCleanup(service.terminate)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f"{self.url}/ping/", timeout=1)
+                break
+            except requests.ConnectionError:
+                if time.monotonic() > deadline or service.poll() is not None:
+                    self.fail("hop service did not start")
+                time.sleep(0.1)
+
+    def hop(self, token):
+        return requests.post(f"{self.url}/ping/", json={"m": 0, "n": 0, "token": token}, timeout=5).json()["status"]
+
+    def test_cancel_reaches_the_hop_service(self):
+        session = Session(4, 4)
+        sessions.get_store().add(session)
+        token = session.start_run()
+        self.assertEqual(self.hop(token), "done")
+
+        config = apps.get_app_config("home")
+        with mock.patch.object(config, "PING_URL", self.url), mock.patch.object(config, "PONG_URL", self.url):
+            response = self.client.post("/api/cancel/", {"session": session.id}, content_type="application/json")
+            self.assertEqual(response.json()["token"], token)
+            deadline = time.monotonic() + 10
+            while self.hop(token) != "cancelled":
+                self.assertLess(time.monotonic(), deadline, "the hop service never learned about the cancel")
+                time.sleep(0.05)
+
+
+class RenderedBodyCacheTests(SimpleTestCase):
+    def test_keeps_the_latest_version_per_session(self):
+        cache = RenderedBodyCache(100)
+        cache.put("a", 1, b"x" * 10)
+        cache.put("a", 2, b"y" * 10)
+        self.assertIsNone(cache.get("a", 1))
+        self.assertEqual(cache.get("a", 2), b"y" * 10)
+        self.assertEqual((len(cache), cache.nbytes), (1, 10))
+
+    def test_evicts_least_recently_used_past_the_budget(self):
+        cache = RenderedBodyCache(25)
+        cache.put("a", 1, b"a" * 10)
+        cache.put("b", 1, b"b" * 10)
+        cache.get("a", 1)
+        cache.put("c", 1, b"c" * 10)
+        self.assertIsNone(cache.get("b", 1))
+        self.assertIsNotNone(cache.get("a", 1))
+        cache.put("d", 1, b"d" * 30)
+        self.assertIsNone(cache.get("d", 1))
+        self.assertEqual(cache.nbytes, 20)
+
+
+class ConditionalGetTests(SimpleTestCase):
+    def setUp(self):
+        self.session = Session(4, 4)
+        sessions.get_store().add(self.session)
+
+    def test_unchanged_state_answers_not_modified(self):
+        for url in ("/api/status/", "/api/ui/"):
+            first = self.client.get(url, {"session": self.session.id})
+            self.assertEqual(first.status_code, 200)
+            etag = first.headers["ETag"]
+
+            again = self.client.get(url, {"session": self.session.id}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again.content, b"")
+
+    def test_writes_change_the_etag_and_the_body(self):
+        first = self.client.get("/api/ui/", {"session": self.session.id})
+        self.session.set_pixel_color(5, (1, 2, 3))
+        self.session.record_fill(5, 6)
+
+        changed = self.client.get("/api/ui/", {"session": self.session.id}, HTTP_IF_NONE_MATCH=first.headers["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(changed.json()["image"], [{"x": 1, "y": 1, "color": [1, 2, 3]}])
+
+
+class ImagePyramidTests(SimpleTestCase):
+    def test_downsample_averages_colored_pixels(self):
+        rng = np.random.default_rng(25)
+        raster = rng.integers(0, 256, size=(5, 7, 4), dtype=np.uint8)
+        raster[..., 3] = rng.choice([0, 255], size=(5, 7))
+        out = downsample(raster)
+
+        self.assertEqual(out.shape, (3, 4, 4))
+        for y in range(3):
+            for x in range(4):
+                block = raster[y * 2:y * 2 + 2, x * 2:x * 2 + 2].reshape(-1, 4).astype(float)
+                colored = block[block[:, 3] == 255]
+                self.assertEqual(out[y, x, 3], round(block[:, 3].mean()))
+                if len(colored):
+                    np.testing.assert_allclose(out[y, x, :3], colored[:, :3].mean(axis=0), atol=0.5)
+
+    def test_incremental_levels_match_a_fresh_build(self):
+        session = Session(37, 53)
+        image_pyramid = get_pyramid(session)
+        rng = random.Random(25)
+        for _ in range(40):
+            start = rng.randrange(0, 37 * 53)
+            session.fill_range(start, start + rng.randrange(1, 90))
+            image_pyramid.tile(1, 0, 0, 1, 1)
+
+        fresh = ImagePyramid(session)
+        for level in range(1, image_pyramid.depth):
+            height, width = image_pyramid.shape(level)
+            np.testing.assert_array_equal(
+                image_pyramid.tile(level, 0, 0, width, height), fresh.tile(level, 0, 0, width, height)
+            )
+        self.assertEqual(image_pyramid.shape(image_pyramid.depth - 1), (1, 1))
+
+    def test_tile_view_returns_a_viewport_at_a_zoom_level(self):
+        session = Session(40, 60)
+        session.fill_range(0, 40 * 60)
+        sessions.get_store().add(session)
+
+        response = self.client.get(
+            "/api/ui/tile/", {"session": session.id, "x": 10, "y": 4, "w": 20, "h": 9, "z": 1, "format": "raw"}
+        )
+        self.assertEqual(response.status_code, 200)
+        _, _, channels, _, m, n, colored = RASTER_HEADER.unpack_from(response.content)
+        self.assertEqual((m, n, channels, colored), (5, 10, 4, 2400))
+        self.assertEqual((response.headers["X-Tile-X"], response.headers["X-Tile-Y"]), ("5", "2"))
+
+        level0 = self.client.get("/api/ui/tile/", {"session": session.id, "x": 3, "y": 1, "w": 4, "h": 2, "format": "raw"})
+        raster = np.frombuffer(level0.content[RASTER_HEADER.size:], dtype=np.uint8).reshape(2, 4, 4)
+        np.testing.assert_array_equal(raster, colorize.rgb_raster(session)[1:3, 3:7])
+
+        outside = self.client.get("/api/ui/tile/", {"session": session.id, "x": 60, "w": 5, "h": 5})
+        self.assertEqual(outside.status_code, 400)
+
@@ -0,0 +1,180 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable
+from urllib.parse import urlsplit
+
+import requests
+from django.apps import apps
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from home import http_client
+
+logger = logging.getLogger(__name__)
+
+LOOPBACK_HOSTS = {"localhost", "127.0.0.1", "::1", "0.0.0.0"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# View -> plain function running the same logic on an already parsed payload
+_HANDLERS = {}
+
+
+def register(view: Callable, handler: Callable[["LoopbackRequest"], Response]) -> None:
+    """
+    Let `handler` serve the requests to `view` that stay in this process.
+    """
+    _HANDLERS[view] = handler
+
+
+class LoopbackRequest:
+    """
+    Stand-in for a DRF request whose payload never left the process.
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+
+
+class LoopbackResponse:
+    """
+    The parts of `requests.Response` the callers of `Transport.send` use.
+    """
+
+    def __init__(self, url: str, status_code: int, data):
+        self.url = url
+        self.status_code = status_code
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class Transport:
+    """
+    Sends hop and update payloads to the ping, pong and main services.
+
+    When the target service runs in this process, which is the default
+    single-server setup where every service URL points back at localhost, the
+    payload is handed to the registered handler directly: no HTTP request,
+    no encoding. Other targets go through the pooled HTTP client.
+
+    `mode` is "auto" (in-process for URLs on this server's own address,
+    `self_url`, whose path resolves to a registered view), "loopback"
+    (in-process for any host) or "http". Loopback host names are
+    interchangeable in "auto" mode, but the port must match: another
+    server on the same machine is reached over HTTP.
+
+    A payload sent from inside a handler on the same thread, e.g. a hop in
+    sync dispatch mode, is queued and run once the current handler returns,
+    so a chain of in-process hops never nests.
+    """
+
+    def __init__(self, mode: str, self_url: str = "http://localhost:8000"):
+        if mode not in ("auto", "loopback", "http"):
+            raise ValueError(f"Unknown hop transport: {mode}")
+        self.mode = mode
+        self.address = _address(self_url)
+        self.local_requests = 0
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._thread = threading.local()
+
+    def handler(self, url: str) -> Callable | None:
+        """
+        Get the in-process handler serving `url`, or None to send it over HTTP.
+        """
+        if self.mode == "http":
+            return None
+        with self._lock:
+            if url not in self._handlers:
+                self._handlers[url] = self._resolve(url)
+            return self._handlers[url]
+
+    def _resolve(self, url: str) -> Callable | None:
+        parts = urlsplit(url)
+        if self.mode == "auto" and _address(url) != self.address:
+            return None
+        try:
+            match = resolve(parts.path)
+        except Resolver404:
+            return None
+        return _HANDLERS.get(match.func)
+
+    def send(self, url: str, payload: dict, timeout: float | tuple[float, float] | None = None):
+        """
+        Deliver `payload` to `url`; `timeout` only applies to HTTP.
+        """
+        handler = self.handler(url)
+        if handler is None:
+            return http_client.post_payload(url, payload, timeout=timeout)
+
+        with self._lock:
+            self.local_requests += 1
+        queue = getattr(self._thread, "queue", None)
+        if queue is not None:
+            queue.append((url, handler, payload))
+            return LoopbackResponse(url, 202, {"status": "queued"})
+
+        self._thread.queue = queue = deque()
+        try:
+            response = self._call(url, handler, payload)
+            while queue:
+                queued = self._call(*queue.popleft())
+                if not queued.ok:
+                    logger.warning("Error delivering to %s: %s", queued.url, queued.data)
+            return response
+        finally:
+            self._thread.queue = None
+
+    @staticmethod
+    def _call(url: str, handler: Callable, payload: dict) -> LoopbackResponse:
+        try:
+            response = handler(LoopbackRequest(payload))
+        except APIException as e:
+            return LoopbackResponse(url, e.status_code, e.detail)
+        except Exception as e:
+            logger.exception("Error handling %s in process", url)
+            return LoopbackResponse(url, 500, {"error": str(e)})
+        return LoopbackResponse(url, response.status_code, response.data)
+
+
+def _address(url: str) -> tuple[str, int | None]:
+    """
+    Get the (host, port) a URL connects to, with every loopback host name as "localhost".
+    """
+    parts = urlsplit(url)
+    host = "localhost" if parts.hostname in LOOPBACK_HOSTS else parts.hostname
+    return host, parts.port or DEFAULT_PORTS.get(parts.scheme)
+
+
+_TRANSPORT = None
+_TRANSPORT_LOCK = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """
+    Get the shared transport, created from the home app settings on first use.
+    """
+    global _TRANSPORT
+    with _TRANSPORT_LOCK:
+        if _TRANSPORT is None:
+            config = apps.get_app_config('home')
+            _TRANSPORT = Transport(config.HOP_TRANSPORT, config.SELF_URL)
+        return _TRANSPORT
+
+
+def send(url: str, payload: dict, timeout: float | tuple[float, float] | None = None):
+    """
+    Shortcut for `get_transport().send(...)`.
+    """
+    return get_transport().send(url, payload, timeout=timeout)
@@ -1,10 +1,26 @@
 from django.urls import path
-from home.views import configure, generate, status, ui_image, update_pixel
+from home.views import (
+    cancel,
+    configure,
+    event_stream,
+    generate,
+    metrics_view,
+    status,
+    ui_image,
+    ui_raster,
+    ui_tile,
+    update_pixel,
+)
 
 urlpatterns = [
     path("configure/", configure),
     path("generate/", generate),
+    path("cancel/", cancel),
     path("status/", status),
     path("ui/", ui_image),
+    path("ui/raster/", ui_raster),
+    path("ui/tile/", ui_tile),
     path("status/update_pixel/", update_pixel),
+    path("events/", event_stream),
+    path("metrics/", metrics_view),
 ]
@@ -1,7 +1,59 @@
-import random
+import numpy as np
 
-def random_unique_color(used_colors):
-    while True:
-        color = (random.randint(0,255), random.randint(0,255), random.randint(0,255))
-        if color not in used_colors:
-            return color
+from home.utils.permutation import KeyedPermutation
+
+COLOR_SPACE = 1 << 24
+
+
+def sequential_colors(indices: np.ndarray) -> np.ndarray:
+    """
+    Derive the sequential RGB color of each linear pixel index.
+
+    Args:
+        indices: Array of linear pixel indices
+
+    Returns:
+        uint8 array of shape (len(indices), 3) holding (R, G, B)
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    colors = np.empty((len(indices), 3), dtype=np.uint8)
+    colors[:, 0] = (indices >> 16) & 0xFF
+    colors[:, 1] = (indices >> 8) & 0xFF
+    colors[:, 2] = indices & 0xFF
+    return colors
+
+
+class UniqueColorAllocator:
+    """
+    Hand out random-looking RGB colors that never repeat within one key.
+
+    Allocation number k is color `permutation(k)` of a keyed bijection over
+    the 2^24 RGB values, so the first 2^24 allocations are all distinct and
+    no set of used colors is needed.
+    """
+
+    def __init__(self, key: int):
+        self.permutation = KeyedPermutation(COLOR_SPACE, key)
+        self.allocated = 0
+
+    def color(self, sequence: int) -> tuple[int, int, int]:
+        """
+        Get the color of allocation number `sequence`.
+        """
+        value = self.permutation(sequence % COLOR_SPACE)
+        return (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF
+
+    def colors(self, sequences: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `color`: uint8 array of shape (len(sequences), 3).
+        """
+        sequences = np.asarray(sequences, dtype=np.int64) % COLOR_SPACE
+        return sequential_colors(self.permutation.permute(sequences))
+
+    def allocate(self, count: int) -> np.ndarray:
+        """
+        Allocate the next `count` colors of this allocator.
+        """
+        start = self.allocated
+        self.allocated += count
+        return self.colors(np.arange(start, start + count))
@@ -0,0 +1,95 @@
+from bisect import bisect_left, bisect_right
+
+
+class IntervalSet:
+    """
+    Set of integers stored as sorted, disjoint [start, end) intervals.
+
+    Overlapping and adjacent intervals are merged as they are added, so a
+    sequential fill stays a single interval however many pieces it came in.
+    Lookups cost O(log k) for k intervals. `add` finds the intervals it
+    touches in O(log k) too, but splices the sorted lists, which moves every
+    later interval: O(k) in the worst case, and O(1) for a sequential fill
+    that extends the last interval.
+    """
+
+    def __init__(self, intervals: list[tuple[int, int]] | None = None):
+        self.starts = []
+        self.ends = []
+        for start, end in intervals or []:
+            self.add(start, end)
+
+    def add(self, start: int, end: int) -> list[tuple[int, int]]:
+        """
+        Add [start, end) and return the sub-ranges that were not in the set yet.
+        """
+        if end <= start:
+            return []
+        # Intervals overlapping or touching [start, end): first ends at or after
+        # `start`, last starts at or before `end`
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+
+        gaps = []
+        cursor = start
+        for position in range(first, last):
+            if self.starts[position] > cursor:
+                gaps.append((cursor, self.starts[position]))
+            cursor = max(cursor, self.ends[position])
+        if cursor < end:
+            gaps.append((cursor, end))
+
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+        return gaps
+
+    def covers(self, start: int, end: int) -> bool:
+        """
+        Whether every integer of [start, end) is in the set.
+        """
+        if end <= start:
+            return True
+        position = bisect_right(self.starts, start) - 1
+        return position >= 0 and self.ends[position] >= end
+
+    def first_missing(self, start: int) -> int:
+        """
+        Get the smallest integer from `start` on that is not in the set.
+        """
+        position = bisect_right(self.starts, start) - 1
+        if position >= 0 and self.ends[position] > start:
+            return self.ends[position]
+        return start
+
+    def take(self, start: int, count: int) -> list[tuple[int, int]]:
+        """
+        Get the first `count` integers of the set from `start` on, as [start, end) intervals.
+        """
+        ranges = []
+        position = bisect_right(self.ends, start)
+        while count > 0 and position < len(self.starts):
+            first = max(start, self.starts[position])
+            last = min(self.ends[position], first + count)
+            ranges.append((first, last))
+            count -= last - first
+            position += 1
+        return ranges
+
+    def __contains__(self, value: int) -> bool:
+        return self.covers(value, value + 1)
+
+    def __iter__(self):
+        return iter(zip(self.starts, self.ends))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def total(self) -> int:
+        """
+        Number of integers in the set.
+        """
+        return sum(end - start for start, end in self)
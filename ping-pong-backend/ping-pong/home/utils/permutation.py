@@ -0,0 +1,89 @@
+import numpy as np
+
+MASK_64 = (1 << 64) - 1
+
+
+def _splitmix64(value: int) -> int:
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+class KeyedPermutation:
+    """
+    Keyed pseudo-random bijection of [0, size) onto itself.
+
+    A balanced Feistel network permutes the smallest even-bit power of two
+    covering `size`; outputs that fall outside [0, size) are walked through
+    the network again until they land inside (cycle walking). Each lookup is
+    O(1) time and the permutation needs no storage beyond its round keys, so
+    `permutation(i)` for i = 0, 1, 2, ... draws every value exactly once in a
+    shuffled order that depends only on `key`.
+    """
+    ROUNDS = 4
+
+    def __init__(self, size: int, key: int):
+        if size < 1:
+            raise ValueError(f"Permutation size must be positive, got {size}")
+        self.size = size
+        bits = max((size - 1).bit_length(), 2)
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = np.uint64((1 << self.half_bits) - 1)
+
+        round_key = key & MASK_64
+        self.round_keys = []
+        for _ in range(self.ROUNDS):
+            round_key = _splitmix64(round_key)
+            self.round_keys.append(np.uint64(round_key))
+
+    def _round(self, right: np.ndarray, round_key: np.uint64) -> np.ndarray:
+        value = right * np.uint64(0x9E3779B97F4A7C15) ^ round_key
+        value ^= value >> np.uint64(29)
+        value *= np.uint64(0xBF58476D1CE4E5B9)
+        value ^= value >> np.uint64(32)
+        return value & self.half_mask
+
+    def _encrypt(self, values: np.ndarray) -> np.ndarray:
+        shift = np.uint64(self.half_bits)
+        left = values >> shift
+        right = values & self.half_mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ self._round(right, round_key)
+        return (left << shift) | right
+
+    def permute(self, values) -> np.ndarray:
+        """
+        Vectorized lookup of an array of positions in [0, size).
+        """
+        values = np.asarray(values, dtype=np.uint64)
+        if values.size and int(values.max()) >= self.size:
+            raise IndexError(f"Permutation position out of range [0, {self.size})")
+        with np.errstate(over="ignore"):
+            result = self._encrypt(values)
+            outside = np.flatnonzero(result >= self.size)
+            while outside.size:
+                result[outside] = self._encrypt(result[outside])
+                outside = outside[result[outside] >= self.size]
+        return result.astype(np.int64)
+
+    def __call__(self, position: int) -> int:
+        """
+        Scalar lookup; same result as `permute`, without NumPy call overhead.
+        """
+        if not 0 <= position < self.size:
+            raise IndexError(f"Permutation position out of range [0, {self.size})")
+        half_mask = int(self.half_mask)
+        round_keys = [int(round_key) for round_key in self.round_keys]
+        value = position
+        while True:
+            left, right = value >> self.half_bits, value & half_mask
+            for round_key in round_keys:
+                mixed = ((right * 0x9E3779B97F4A7C15) & MASK_64) ^ round_key
+                mixed ^= mixed >> 29
+                mixed = (mixed * 0xBF58476D1CE4E5B9) & MASK_64
+                mixed ^= mixed >> 32
+                left, right = right, left ^ (mixed & half_mask)
+            value = (left << self.half_bits) | right
+            if value < self.size:
+                return value
@@ -1,9 +1,38 @@
-import random
+import numpy as np
 
+from home.utils.permutation import KeyedPermutation
 
-def random_empty_position(m, n, image):
-    empty = [(x, y) for x in range(m) for y in range(n) if (x, y) not in image]
-    return random.choice(empty)
+
+class RandomPositionSampler:
+    """
+    Draw the pixels of an m x n grid in a seeded random order, without replacement.
+
+    Draw number `cursor` is a lookup in a keyed permutation of the linear
+    indices, so each draw is O(1) and the sampler keeps no list of empty
+    positions. The same seed always yields the same order. With `start` and
+    `end`, only the indices in [start, end) are drawn, by the draw numbers
+    in that same range.
+    """
+
+    def __init__(self, m: int, n: int, seed: int, start: int = 0, end: int | None = None):
+        self.n = n
+        self.start = start
+        end = m * n if end is None else end
+        self.permutation = KeyedPermutation(end - start, seed)
+
+    def draw(self, cursor: int) -> tuple[int, int]:
+        """
+        Get the (x, y) position of the draw number `cursor`.
+        """
+        return index_to_xy(self.start + self.permutation(cursor - self.start), self.n)
+
+    def draws(self, start: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized `draw` of the draw numbers [start, start + count); returns (xs, ys).
+        """
+        indices = self.start + self.permutation.permute(np.arange(start - self.start, start - self.start + count))
+        ys, xs = np.divmod(indices, self.n)
+        return xs, ys
 
 
 def xy_to_index(x: int, y: int, n: int) -> int:
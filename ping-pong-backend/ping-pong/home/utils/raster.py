@@ -0,0 +1,127 @@
+import gzip
+import struct
+import zlib
+
+import numpy as np
+
+# magic, version, channels, reserved, m, n, colored pixels
+RASTER_HEADER = struct.Struct("<4sBBHIIQ")
+RASTER_MAGIC = b"PPRS"
+RASTER_VERSION = 1
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COLOR_TYPES = {3: 2, 4: 6}  # RGB, RGBA
+
+
+def build_raster(m: int, n: int, indices: np.ndarray, colors: np.ndarray, channels: int = 4) -> np.ndarray:
+    """
+    Paint colored pixels into a packed (m, n, channels) uint8 raster.
+
+    Args:
+        m: Grid height (number of rows)
+        n: Grid width (number of columns)
+        indices: Linear indices of the colored pixels
+        colors: uint8 array of shape (len(indices), 3)
+        channels: 3 for RGB, 4 for RGBA (alpha marks colored pixels)
+
+    Returns:
+        uint8 array of shape (m, n, channels)
+    """
+    raster = np.zeros((m * n, channels), dtype=np.uint8)
+    raster[indices, :3] = colors
+    if channels == 4:
+        raster[indices, 3] = 255
+    return raster.reshape(m, n, channels)
+
+
+def downsample(raster: np.ndarray) -> np.ndarray:
+    """
+    Halve an RGBA raster, for the next level of an image pyramid.
+
+    Each output pixel covers a 2x2 block: its color is the alpha-weighted mean
+    of the block's colors, its alpha the mean alpha of the block's pixels, so
+    alpha keeps the fraction of colored pixels. Blocks on an odd border are
+    averaged over the pixels they have.
+
+    Args:
+        raster: uint8 array of shape (h, w, 4)
+
+    Returns:
+        uint8 array of shape (ceil(h / 2), ceil(w / 2), 4)
+    """
+    h, w = raster.shape[:2]
+    height, width = (h + 1) // 2, (w + 1) // 2
+    if (h, w) != (height * 2, width * 2):
+        padded = np.zeros((height * 2, width * 2, 4), dtype=np.uint8)
+        padded[:h, :w] = raster
+        raster = padded
+
+    # Sum the four pixels of every block through strided views, no reshapes
+    block_alpha = np.zeros((height, width), dtype=np.uint32)
+    block_weighted = np.zeros((height, width, 3), dtype=np.uint32)
+    for dy in (0, 1):
+        for dx in (0, 1):
+            quad = raster[dy::2, dx::2]
+            alpha = quad[..., 3].astype(np.uint32)
+            block_alpha += alpha
+            block_weighted += quad[..., :3] * alpha[..., None]
+    block_cells = np.full((height, width), 4, dtype=np.uint32)
+    if h % 2:
+        block_cells[-1] //= 2
+    if w % 2:
+        block_cells[:, -1] //= 2
+
+    out = np.empty((height, width, 4), dtype=np.uint8)
+    divisor = np.maximum(block_alpha, 1)[..., None]
+    out[..., :3] = (block_weighted + divisor // 2) // divisor
+    out[..., 3] = (block_alpha + block_cells // 2) // block_cells
+    return out
+
+
+def pack_raster(raster: np.ndarray, colored_pixels: int) -> bytes:
+    """
+    Prefix the raw raster bytes with the fixed-size binary header.
+    """
+    m, n, channels = raster.shape
+    header = RASTER_HEADER.pack(RASTER_MAGIC, RASTER_VERSION, channels, 0, m, n, colored_pixels)
+    return header + raster.tobytes()
+
+
+def encode_raw(raster: np.ndarray, colored_pixels: int) -> bytes:
+    return pack_raster(raster, colored_pixels)
+
+
+def encode_zlib(raster: np.ndarray, colored_pixels: int, level: int = 6) -> bytes:
+    return zlib.compress(pack_raster(raster, colored_pixels), level)
+
+
+def encode_gzip(raster: np.ndarray, colored_pixels: int, level: int = 6) -> bytes:
+    return gzip.compress(pack_raster(raster, colored_pixels), compresslevel=level, mtime=0)
+
+
+def _png_chunk(kind: bytes, body: bytes) -> bytes:
+    crc = zlib.crc32(body, zlib.crc32(kind))
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", crc)
+
+
+def encode_png(raster: np.ndarray, colored_pixels: int, level: int = 6) -> bytes:
+    """
+    Encode the raster as a PNG image.
+
+    Every scanline uses filter type 0, so the IDAT stream is just the raster
+    with a zero byte in front of each row; the colored pixel count travels in
+    a tEXt chunk.
+    """
+    m, n, channels = raster.shape
+    scanlines = np.zeros((m, 1 + n * channels), dtype=np.uint8)
+    scanlines[:, 1:] = raster.reshape(m, n * channels)
+
+    ihdr = struct.pack(">IIBBBBB", n, m, 8, PNG_COLOR_TYPES[channels], 0, 0, 0)
+    text = b"colored_pixels\x00" + str(colored_pixels).encode()
+    return b"".join([
+        PNG_SIGNATURE,
+        _png_chunk(b"IHDR", ihdr),
+        _png_chunk(b"tEXt", text),
+        _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), level)),
+        _png_chunk(b"IEND", b""),
+    ])
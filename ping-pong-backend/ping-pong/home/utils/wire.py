@@ -0,0 +1,143 @@
+import struct
+
+import numpy as np
+
+WIRE_MEDIA_TYPE = "application/x-pingpong"
+
+# magic, version, field count
+WIRE_HEADER = struct.Struct("<4sBxH")
+WIRE_MAGIC = b"PPWF"
+WIRE_VERSION = 1
+
+# Value type tags
+NONE, FALSE, TRUE, INT, FLOAT, STR, DICT, ARRAY = range(8)
+# Array element types, stored little-endian
+DTYPES = [np.dtype(code) for code in ("<i8", "<u4", "u1", "<f8", "<u8", "<i4")]
+DTYPE_CODES = {dtype: code for code, dtype in enumerate(DTYPES)}
+
+_LENGTH = struct.Struct("<I")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_ARRAY = struct.Struct("<BB")
+_DIM = struct.Struct("<Q")
+
+
+def encode(payload: dict) -> bytes:
+    """
+    Encode a hop or update payload in the compact binary wire format.
+
+    A payload is a dict of None, bool, int, float, str, nested dicts, NumPy
+    arrays, and lists or tuples of numbers (sent as int64/float64 arrays). Arrays
+    are written as a dtype code, their shape and the raw little-endian bytes, so
+    `decode` maps them straight back with `np.frombuffer`.
+
+    Raises:
+        TypeError: for values the format cannot carry, e.g. lists of dicts
+    """
+    chunks = []
+    _encode_dict(payload, chunks)
+    return b"".join(chunks)
+
+
+def _encode_dict(payload: dict, chunks: list) -> None:
+    chunks.append(WIRE_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, len(payload)))
+    for key, value in payload.items():
+        name = key.encode()
+        chunks.append(bytes([len(name)]) + name)
+        _encode_value(value, chunks)
+
+
+def _encode_value(value, chunks: list) -> None:
+    if value is None:
+        chunks.append(bytes([NONE]))
+    elif isinstance(value, (bool, np.bool_)):
+        chunks.append(bytes([TRUE if value else FALSE]))
+    elif isinstance(value, (int, np.integer)):
+        chunks.append(bytes([INT]) + _INT.pack(int(value)))
+    elif isinstance(value, (float, np.floating)):
+        chunks.append(bytes([FLOAT]) + _FLOAT.pack(float(value)))
+    elif isinstance(value, str):
+        data = value.encode()
+        chunks.append(bytes([STR]) + _LENGTH.pack(len(data)) + data)
+    elif isinstance(value, dict):
+        chunks.append(bytes([DICT]))
+        _encode_dict(value, chunks)
+    else:
+        array = np.asarray(value)
+        if array.dtype.kind == "b":
+            array = array.astype(np.uint8)
+        elif array.dtype.kind in "iu" and array.dtype.newbyteorder("<") not in DTYPE_CODES:
+            array = array.astype(np.int64)
+        elif array.dtype.kind == "f":
+            array = array.astype(np.float64)
+        dtype = array.dtype.newbyteorder("<")
+        if dtype not in DTYPE_CODES:
+            raise TypeError(f"Cannot encode {type(value).__name__} of {array.dtype} on the wire")
+        chunks.append(bytes([ARRAY]) + _ARRAY.pack(DTYPE_CODES[dtype], array.ndim))
+        chunks.extend(_DIM.pack(size) for size in array.shape)
+        chunks.append(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+
+def decode(body: bytes) -> dict:
+    """
+    Decode a binary wire payload; arrays are read-only views of `body`.
+
+    Raises:
+        ValueError: if the body is not a well-formed payload
+    """
+    try:
+        payload, offset = _decode_dict(memoryview(body), 0)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"Truncated wire payload: {e}")
+    if offset != len(body):
+        raise ValueError("Trailing bytes after wire payload")
+    return payload
+
+
+def _decode_dict(body: memoryview, offset: int) -> tuple[dict, int]:
+    magic, version, count = WIRE_HEADER.unpack_from(body, offset)
+    if magic != WIRE_MAGIC:
+        raise ValueError("Not a wire payload")
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire version: {version}")
+    offset += WIRE_HEADER.size
+
+    payload = {}
+    for _ in range(count):
+        length = body[offset]
+        key = bytes(body[offset + 1:offset + 1 + length]).decode()
+        payload[key], offset = _decode_value(body, offset + 1 + length)
+    return payload, offset
+
+
+def _decode_value(body: memoryview, offset: int):
+    tag = body[offset]
+    offset += 1
+    if tag == NONE:
+        return None, offset
+    if tag in (FALSE, TRUE):
+        return tag == TRUE, offset
+    if tag == INT:
+        return _INT.unpack_from(body, offset)[0], offset + _INT.size
+    if tag == FLOAT:
+        return _FLOAT.unpack_from(body, offset)[0], offset + _FLOAT.size
+    if tag == STR:
+        (length,) = _LENGTH.unpack_from(body, offset)
+        offset += _LENGTH.size
+        if offset + length > len(body):
+            raise ValueError("Truncated wire payload")
+        return bytes(body[offset:offset + length]).decode(), offset + length
+    if tag == DICT:
+        return _decode_dict(body, offset)
+    if tag == ARRAY:
+        code, ndim = _ARRAY.unpack_from(body, offset)
+        offset += _ARRAY.size
+        shape = [_DIM.unpack_from(body, offset + i * _DIM.size)[0] for i in range(ndim)]
+        offset += ndim * _DIM.size
+        dtype = DTYPES[code]
+        size = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        if offset + size > len(body):
+            raise ValueError("Truncated wire payload")
+        array = np.frombuffer(body, dtype=dtype, count=size // dtype.itemsize, offset=offset)
+        return array.reshape(shape), offset + size
+    raise ValueError(f"Unknown wire value tag: {tag}")
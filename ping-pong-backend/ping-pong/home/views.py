@@ -1,72 +1,165 @@
-import requests
 import numpy as np
+import requests
 
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from .serializers import ConfigSerializer
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from .serializers import ConfigSerializer, GenerateSerializer, ImagePageSerializer, TileSerializer
+from .parsers import WireParser
 from rest_framework.request import Request
 from rest_framework import status as response_status
 from django.apps import apps
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from . import caching, colorize, events, metrics, pyramid, transport
+from .renderers import (
+    EventStreamRenderer,
+    GzipRasterRenderer,
+    PNGRasterRenderer,
+    PrometheusRenderer,
+    RawRasterRenderer,
+    ZlibRasterRenderer,
+)
+from .utils.colors import sequential_colors
 from .utils.positions import xy_to_index, index_to_xy
 
-from home import state
+from home import sessions
+from home.state import Session
+
+
+def _session(session_id: str | None) -> Session:
+    """
+    Get the session named by a request, or the latest one when it names none.
+
+    Raises:
+        NotFound: if the session is unknown or was evicted
+    """
+    session = sessions.get_session(session_id)
+    if session is None:
+        raise NotFound(f"Unknown session: {session_id}" if session_id else "No session; call configure first")
+    return session
+
+
+def _session_etag(request, *args, **kwargs) -> str | None:
+    """
+    ETag of the session named by a request, None if there is no such session.
+
+    Lets `condition` answer a matching If-None-Match with 304 before the view
+    builds anything. The tag is read before the view runs, so it is never
+    newer than the body it is sent with.
+    """
+    session = sessions.get_session(request.GET.get('session'))
+    return session.etag() if session is not None else None
 
 
 @api_view(['POST'])
 def configure(request: Request) -> Response:
     """
     Configure the grid dimensions for image generation.
+
+    Every call starts a new session, returned as `session`, and leaves the
+    running ones alone; the other endpoints take it as `session` and
+    default to the latest one.
     """
     serializer = ConfigSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
-    state.CURRENT_IMAGE = {}
-    state.CURRENT_X = 0
-    state.CURRENT_Y = 0
-    state.GRID_M = serializer.data.get('m')
-    state.GRID_N = serializer.data.get('n')
-    state.CURRENT_IMAGE_NP = np.zeros((state.GRID_M, state.GRID_N), dtype=np.uint8)
+    try:
+        session = sessions.get_store().create(
+            serializer.data.get('m'),
+            serializer.data.get('n'),
+            backend=serializer.data.get('backend') or apps.get_app_config('home').GRID_BACKEND,
+            seed=serializer.data.get('seed'),
+        )
+    except sessions.SessionLimitError as e:
+        raise ValidationError({"m": str(e)})
 
-    return Response({"status": "configured", "m": state.GRID_M, "n": state.GRID_N}, status=response_status.HTTP_200_OK)
+    return Response(
+        {"status": "configured", "session": session.id, "m": session.m, "n": session.n, "backend": session.grid.name},
+        status=response_status.HTTP_200_OK
+    )
 
 
 @api_view(['POST'])
 def generate(request: Request) -> Response:
     """
     Generate image using original ping-pong method.
+
+    The grid is split into `lanes` disjoint index ranges, each generated by
+    its own ping/pong chain, so hops of different lanes overlap in time.
+    Every call starts a run with a new `token` and cancels the previous run
+    of the session, whose chains stop at their next hop.
     
     Args:
-        request: HTTP request with grid configuration {"m": int, "n": int}
+        request: HTTP request with an optional {"session": str, "lanes": int},
+            `lanes` defaulting to the GENERATION_LANES setting
         
     Returns:
         Response with generation results
     """
-
-    if not state.GRID_M or not state.GRID_N:
-        return Response({"error": "m and n are required"}, status=response_status.HTTP_400_BAD_REQUEST)
+    serializer = GenerateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    session = _session(serializer.data.get('session'))
+    config = apps.get_app_config('home')
+    session.set_lanes(session.split_lanes(serializer.data.get('lanes') or config.GENERATION_LANES))
+    token = session.start_run()
     
     try:
-        response = requests.post(
-            f"{apps.get_app_config('home').MAIN_URL}/ping/",
-            json={
-                "m": state.GRID_M,
-                "n": state.GRID_N,
-                "image": []
-            },
-            timeout=30
-        )
-        response.raise_for_status()
+        for lane, (start, end) in enumerate(session.lanes):
+            # Resume from the current state, e.g. after a restore: small grids
+            # draw their pixels in a seeded order, the others fill sequentially
+            seq, next_index = session.lane_resume(lane)
+            response = transport.send(
+                f"{config.PING_URL}/ping/",
+                {
+                    "session": session.id,
+                    "token": token,
+                    "m": session.m,
+                    "n": session.n,
+                    "seed": session.seed,
+                    "generation": session.generation,
+                    "lane": lane,
+                    "lane_start": start,
+                    "lane_end": end,
+                    "seq": seq,
+                    "next_index": next_index
+                }
+            )
+            response.raise_for_status()
         
         return Response({
             'status': 'generation_started',
-            'm': state.GRID_M,
-            'n': state.GRID_N
+            'session': session.id,
+            'token': token,
+            'm': session.m,
+            'n': session.n,
+            'lanes': session.lane_progress()
         })
         
     except requests.exceptions.RequestException as e:
         print(f"Error starting generation: {e}")
         return Response({"error": str(e)}, status=response_status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['POST'])
+def cancel(request: Request) -> Response:
+    """
+    Cancel the running generation of a session, or of the latest one.
+
+    Hops and updates of the run are dropped on arrival from now on; the
+    pixels already filled stay, and `generate` resumes from them.
+    """
+    session = _session(request.data.get('session'))
+    token = session.cancel()
+    return Response({"status": "cancelled" if token else "idle", "session": session.id, "token": token})
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_session_etag)
 @api_view(['GET'])
 def status(request: Request) -> Response:
     """
@@ -78,62 +171,108 @@ def status(request: Request) -> Response:
     except (ValueError, TypeError):
         return Response({"error": "Invalid parameters"}, status=400)
     
-    total_pixels = state.GRID_M * state.GRID_N
-    if total_pixels <= 784:
-        current_index = len(state.CURRENT_IMAGE)
-        done = current_index >= total_pixels
-        progress_percentage = (current_index / total_pixels * 100) if total_pixels > 0 else 0
-    else:
-        current_index = state.CURRENT_Y * state.GRID_N + state.CURRENT_X
-        done = state.CURRENT_Y >= state.GRID_M
-        progress_percentage = (current_index / total_pixels * 100) if total_pixels > 0 else 0
-    
+    session = _session(request.query_params.get('session'))
+    progress = session.progress()
+    done = progress["done"]
+
     return Response({
-        "colored_pixels": current_index,
-        "total_pixels": total_pixels,
-        "done": done,
-        "progress_percentage": progress_percentage,
-        "current_position": (state.CURRENT_X, state.CURRENT_Y) if not done else None
+        **progress,
+        "current_position": (session.current_x, session.current_y) if not done else None
     })
 
 
-@api_view(['POST'])
-def update_pixel(request: Request) -> Response:
+def _apply_range(session: Session, start_index: int, end_index: int) -> int:
+    """
+    Fill [start_index, end_index), log and publish the newly filled pixels.
+
+    Returns the number of newly filled pixels; a range that was applied
+    before is skipped, so updates can be retried.
+    """
+    # Held across fill, log and publish so clients see fills in log order
+    with session.lock:
+        filled_ranges = session.fill_range(start_index, end_index)
+        seqs = [session.record_fill(start, end) for start, end in filled_ranges]
+        if filled_ranges:
+            session.broadcaster.publish(seqs[0], filled_ranges)
+        session.move_cursor(end_index)
+    return sum(end - start for start, end in filled_ranges)
+
+
+def _apply_pixel(session: Session, x: int, y: int, color: tuple[int, int, int]) -> bool:
+    """
+    Color a small-grid pixel, log and publish it if it is new.
+    """
+    if x >= session.n or y >= session.m:
+        return False
+    index = xy_to_index(x, y, session.n)
+    with session.lock:
+        if not session.set_pixel_color(index, color):
+            return False
+        seq = session.record_fill(index, index + 1)
+        session.broadcaster.publish(seq, [(index, index + 1)], [{"x": x, "y": y, "color": color}])
+    return True
+
+
+def apply_update(request: Request) -> Response:
     """
     Add a new pixel to the current image.
     Main service maintains the state while ping/pong remain stateless.
+
+    Besides single pixels and ranges, accepts the merged batches sent by
+    `home.progress.ProgressReporter`: {"ranges": [[start, end], ...],
+    "pixel_xy": [[x, y], ...], "pixel_colors": [[r, g, b], ...]}, as JSON
+    or in the binary wire format; {"pixels": [{"x", "y", "color"}, ...]} is
+    accepted too. Updates go to the session named by `session`, or the
+    latest one; those of a cancelled or replaced run `token` are refused
+    with a 409. Also called in process by `home.transport`.
     """
+    session = _session(request.data.get('session'))
+    token = request.data.get('token')
+    if not session.accepts(token):
+        # Ack stale work at once; the 409 tells remote hop services to drop the run
+        return Response(
+            {"status": "stale", "session": session.id, "token": token},
+            status=response_status.HTTP_409_CONFLICT,
+        )
     try:
-        total_pixels = state.GRID_M * state.GRID_N
+        total_pixels = session.m * session.n
+
+        if 'ranges' in request.data or 'pixels' in request.data or 'pixel_xy' in request.data:
+            ranges = np.asarray(request.data.get('ranges', []), dtype=np.int64).reshape(-1, 2).tolist()
+            if 'pixel_xy' in request.data:
+                xy = np.asarray(request.data['pixel_xy'], dtype=np.int64).reshape(-1, 2).tolist()
+                colors = np.asarray(request.data['pixel_colors'], dtype=np.int64).reshape(-1, 3).tolist()
+            else:
+                pixels = request.data.get('pixels', [])
+                xy = [(p['x'], p['y']) for p in pixels]
+                colors = [p['color'] for p in pixels]
+            pixels_updated = sum(_apply_range(session, start, end) for start, end in ranges)
+            pixels_updated += sum(_apply_pixel(session, x, y, tuple(color)) for (x, y), color in zip(xy, colors))
+
+            return Response({
+                "status": "batch_updated",
+                "ranges": len(ranges),
+                "pixels": len(xy),
+                "pixels_updated": pixels_updated,
+                "total_filled": session.filled_count(),
+                "total_pixels": total_pixels,
+                "method": "batch_update"
+            }, status=response_status.HTTP_200_OK)
 
         if 'start_index' in request.data and 'end_index' in request.data:
             start_index = request.data['start_index']
             end_index = request.data['end_index']
             
-            pixels_updated = 0
-            for pixel_index in range(start_index, end_index):
-                y = pixel_index // state.GRID_N
-                x = pixel_index % state.GRID_N
-                
-                # Bounds check
-                if 0 <= x < state.GRID_N and 0 <= y < state.GRID_M:
-                    # Only update if pixel is not already set (avoid duplicates)
-                    if state.CURRENT_IMAGE_NP[y, x] == 0:
-                        state.CURRENT_IMAGE_NP[y, x] = 1
-                        pixels_updated += 1
-
-            
-            state.CURRENT_X = end_index % state.GRID_N
-            state.CURRENT_Y = end_index // state.GRID_N
+            pixels_updated = _apply_range(session, start_index, end_index)
             
             return Response({
                 "status": "range_updated",
                 "start_index": start_index,
                 "end_index": end_index,
                 "pixels_updated": pixels_updated,  # Actual new pixels, not range size
-                "total_filled": int(np.sum(state.CURRENT_IMAGE_NP)),
+                "total_filled": session.filled_count(),
                 "total_pixels": total_pixels,
-                "progress_percentage": (int(np.sum(state.CURRENT_IMAGE_NP)) / total_pixels * 100),
+                "progress_percentage": (session.filled_count() / total_pixels * 100),
                 "method": "range_update"
             }, status=response_status.HTTP_200_OK)
        
@@ -141,46 +280,41 @@ def update_pixel(request: Request) -> Response:
         pixel = request.data['pixel']
         x, y = pixel['x'], pixel['y']
         
-        if total_pixels <= 784:
+        if session.random_colors:
             color = tuple(pixel['color'])
 
-            if state.CURRENT_IMAGE is None:
-                state.CURRENT_IMAGE = {}
-            
-            if len(state.CURRENT_IMAGE) >= total_pixels:
+            if session.is_done():
                 return Response({"status": "done"})
             
-            if x >= state.GRID_N or y >= state.GRID_M:
+            if x >= session.n or y >= session.m:
                 return Response({"status": "out_of_bounds"})
             
-            index = xy_to_index(x, y, state.GRID_N)
-            state.CURRENT_IMAGE[index] = color
+            _apply_pixel(session, x, y, color)
         
             return Response({
                 "status": "updated", 
-                "total_pixels": len(state.CURRENT_IMAGE),
+                "total_pixels": session.filled_count(),
                 "pixel": pixel
             }, status=response_status.HTTP_200_OK)
         else:
-            if np.sum(state.CURRENT_IMAGE_NP) >= total_pixels:
-                state.CURRENT_IMAGE = {}
+            if session.is_done():
+                return Response({"status": "done"})
             
-            if x >= state.GRID_N or y >= state.GRID_M:
+            if x >= session.n or y >= session.m:
                 return Response({"status": "out_of_bounds"})
 
-            x, y = state.CURRENT_X, state.CURRENT_Y
-            state.CURRENT_IMAGE_NP[y, x] = 1
-            # Move to next position for next call
-            state.CURRENT_X += 1
-            if state.CURRENT_X >= state.GRID_N:
-                state.CURRENT_X = 0
-                state.CURRENT_Y += 1
+            # Reserve the position atomically, so concurrent calls never share one
+            index, end = session.reserve()
+            if index == end:
+                return Response({"status": "done"})
+            x, y = index_to_xy(index, session.n)
+            _apply_range(session, index, index + 1)
 
             return Response({
                 "status": "updated",
                 "position": (x, y),
-                "index": y * state.GRID_N + x,
-                "next_position": (state.CURRENT_X, state.CURRENT_Y) if state.CURRENT_Y < state.GRID_M else None
+                "index": y * session.n + x,
+                "next_position": (session.current_x, session.current_y) if session.current_y < session.m else None
             }, status=response_status.HTTP_200_OK)
     
     except Exception as e:
@@ -188,74 +322,269 @@ def update_pixel(request: Request) -> Response:
         return Response({"status": "error", "message": str(e)}, status=response_status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@parser_classes([JSONParser, WireParser])
+def update_pixel(request: Request) -> Response:
+    return apply_update(request)
+
+
+transport.register(update_pixel, apply_update)
+
+
+def _parse_cursor(since: str) -> tuple[str, int]:
+    generation, _, seq = since.partition(':')
+    seq = int(seq)
+    if seq < 0:
+        raise ValueError(f"Invalid cursor sequence: {seq}")
+    return generation, seq
+
+
+def _pixel_color(session: Session, index: int) -> tuple[int, int, int]:
+    """
+    Get the color of a filled small-grid pixel: its random color, or the
+    sequential one if it was filled as part of a range.
+    """
+    color = session.image.get(index)
+    if color is None:
+        color = tuple(sequential_colors([index])[0].tolist())
+    return color
+
+
+def _ui_image_page(request: Request, session: Session, start: int, limit: int) -> Response:
+    """
+    Get up to `limit` colored pixels from linear index `start` on; pages are not cached.
+    """
+    cursor = session.cursor()
+    image_list, next_index = colorize.image_page(session, start, limit)
+    response = {
+        "image": image_list,
+        "m": session.m,
+        "n": session.n,
+        "colored_pixels": session.filled_count(),
+        "total_pixels": session.m * session.n,
+        "cursor": cursor,
+        "start": start,
+        "next": next_index,
+        "raster": f"{request.path}raster/?session={session.id}",
+    }
+    if not session.random_colors:
+        response["method"] = "sequential_unique_colors"
+    return Response(response)
+
+
+def _ui_image_delta(session: Session, since: str) -> Response:
+    """
+    Get the pixels filled after the `since` cursor.
+
+    A cursor from a previous generation replays the current one from the
+    start and flags the response with `reset` so the client clears its image.
+    """
+    try:
+        generation, seq = _parse_cursor(since)
+    except ValueError:
+        return Response({"error": "Invalid cursor"}, status=response_status.HTTP_400_BAD_REQUEST)
+
+    # Read the cursor first: fills racing with this request are resent, not lost
+    next_cursor = session.cursor()
+    reset = generation != session.generation
+    ranges = session.fills_since(0 if reset else seq)
+    total_pixels = session.m * session.n
+
+    response = {
+        "cursor": next_cursor,
+        "reset": reset,
+        "ranges": ranges,
+        "m": session.m,
+        "n": session.n,
+        "total_pixels": total_pixels,
+    }
+    if session.random_colors:
+        image_list = []
+        for start, end in ranges:
+            for index in range(start, end):
+                x, y = index_to_xy(index, session.n)
+                image_list.append({"x": x, "y": y, "color": _pixel_color(session, index)})
+        response["image"] = image_list
+
+    return Response(response)
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_session_etag)
 @api_view(['GET'])
 def ui_image(request: Request) -> Response:
     """
     Get the current image as JSON for the frontend.
+
+    With a `since` cursor (returned as `cursor` by every call) only the
+    pixels filled after it are sent: `ranges` of linear indices, plus the
+    colored `image` pixels for small grids whose colors are random.
+
+    Images of more than UI_PAGE_PIXELS colored pixels, or any request with a
+    `start` index, are sent one page at a time: the pixels from linear index
+    `start` on, the `next` index to ask for, None after the last page, and
+    the `raster` URL serving the whole image compactly.
+
+    Unpaged JSON bodies are cached per session state, so polling an idle or
+    finished session neither rebuilds nor re-serializes the image.
     """
-    total_pixels = state.GRID_M * state.GRID_N
-    
-    if total_pixels <= 784:
-        image_list = []
-        for index, color in state.CURRENT_IMAGE.items():
-            x, y = index_to_xy(index, state.GRID_N)
-            image_list.append({
-                "x": x,
-                "y": y, 
-                "color": color
-            })
-        
-        return Response({
-            "image": image_list,
-            "m": state.GRID_M,
-            "n": state.GRID_N,
-            "colored_pixels": len(state.CURRENT_IMAGE),
-            "total_pixels": total_pixels
-        })
+    session = _session(request.query_params.get('session'))
+    since = request.query_params.get('since')
+    if since:
+        return _ui_image_delta(session, since)
+
+    serializer = ImagePageSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    page_pixels = apps.get_app_config('home').UI_PAGE_PIXELS
+    start = serializer.validated_data.get('start')
+    if start is not None or session.filled_count() > page_pixels:
+        return _ui_image_page(request, session, start or 0, page_pixels)
+
+    # Read before the image: a racing write makes the key older, never newer, than the body
+    etag = session.etag()
+    cache = caching.get_ui_cache()
+    cacheable = isinstance(request.accepted_renderer, JSONRenderer)
+    if cacheable:
+        body = cache.get(session.id, etag)
+        if body is not None:
+            return HttpResponse(body, content_type=JSONRenderer.media_type)
+
+    cursor = session.cursor()
+    total_pixels = session.m * session.n
+    image_list = colorize.image_list(session)
+
+    response = {
+        "image": image_list,
+        "m": session.m,
+        "n": session.n,
+        "colored_pixels": len(image_list),
+        "total_pixels": total_pixels,
+        "cursor": cursor
+    }
+    if not session.random_colors:
+        response["method"] = "sequential_unique_colors"
+
+    if not cacheable:
+        return Response(response)
+    body = JSONRenderer().render(response)
+    cache.put(session.id, etag, body)
+    return HttpResponse(body, content_type=JSONRenderer.media_type)
+
+
+@api_view(['GET'])
+@renderer_classes([PNGRasterRenderer, RawRasterRenderer, ZlibRasterRenderer, GzipRasterRenderer])
+def ui_raster(request: Request) -> Response:
+    """
+    Get the current image as a packed binary raster for the frontend.
+
+    The encoding is negotiated from the Accept header or the `format` query
+    parameter: `png`, `raw`, `zlib` or `gzip`. The raw/zlib/gzip bodies start
+    with a fixed header carrying m, n and the colored pixel count, which are
+    also sent as X-Grid-M, X-Grid-N and X-Colored-Pixels response headers.
+    """
+    try:
+        channels = int(request.query_params.get('channels', 4))
+    except (ValueError, TypeError):
+        channels = 0
+    if channels not in (3, 4):
+        raise ValidationError({"channels": "channels must be 3 or 4"})
+
+    session = _session(request.query_params.get('session'))
+    raster = colorize.rgb_raster(session, channels)
+    colored_pixels = len(colorize.colored_pixels(session)[0])
+
+    return Response(
+        {"raster": raster, "colored_pixels": colored_pixels},
+        headers={
+            "X-Grid-M": str(session.m),
+            "X-Grid-N": str(session.n),
+            "X-Colored-Pixels": str(colored_pixels),
+        },
+    )
+
+
+@cache_control(no_cache=True)
+@vary_on_headers('Accept')
+@condition(etag_func=_session_etag)
+@api_view(['GET'])
+@renderer_classes([PNGRasterRenderer, RawRasterRenderer, ZlibRasterRenderer, GzipRasterRenderer])
+def ui_tile(request: Request) -> Response:
+    """
+    Get a viewport of the image at a zoom level, as a binary raster.
+
+    The viewport x, y, w, h is given in image pixels; zoom level z scales it
+    down by 2^z, so a whole huge image fits a screen at a high enough level.
+    Levels above 0 come from the session's image pyramid (see home.pyramid):
+    the color of a pixel is the mean of the colored pixels it covers and its
+    alpha the colored fraction. Encodings are as for /ui/raster/, always
+    RGBA; the tile origin and level are sent as X-Tile-* headers.
+    """
+    serializer = TileSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    viewport = serializer.validated_data
+
+    session = _session(viewport.get('session'))
+    image_pyramid = pyramid.get_pyramid(session)
+    level = viewport['z']
+    if level >= image_pyramid.depth:
+        raise ValidationError({"z": f"z must be below {image_pyramid.depth} for this image"})
+
+    scale = 1 << level
+    height, width = image_pyramid.shape(level)
+    x0, y0 = viewport['x'] // scale, viewport['y'] // scale
+    x1 = min(-(-(viewport['x'] + viewport['w']) // scale), width)
+    y1 = min(-(-(viewport['y'] + viewport['h']) // scale), height)
+    if x0 >= x1 or y0 >= y1:
+        raise ValidationError({"viewport": "The viewport is outside the image"})
+    max_pixels = apps.get_app_config('home').MAX_TILE_PIXELS
+    if (x1 - x0) * (y1 - y0) > max_pixels:
+        raise ValidationError({"viewport": f"The tile is over {max_pixels} pixels; use a higher z"})
+
+    tile = image_pyramid.tile(level, x0, y0, x1, y1)
+    colored_pixels = session.filled_count()
+
+    return Response(
+        {"raster": tile, "colored_pixels": colored_pixels},
+        headers={
+            "X-Grid-M": str(session.m),
+            "X-Grid-N": str(session.n),
+            "X-Colored-Pixels": str(colored_pixels),
+            "X-Tile-Level": str(level),
+            "X-Tile-Levels": str(image_pyramid.depth),
+            "X-Tile-X": str(x0),
+            "X-Tile-Y": str(y0),
+        },
+    )
+
+
+@api_view(['GET'])
+@renderer_classes([EventStreamRenderer])
+def event_stream(request: Request) -> StreamingHttpResponse:
+    """
+    Push progress and pixel batches to the frontend as Server-Sent Events.
+
+    Events: `pixels` ({"ranges", "image"}, image only for small grids),
+    `progress` (as /status/ plus `cursor`), `resync` ({"cursor"}) when the
+    client should fetch /ui/?since=<cursor>, and `done`. Every stream starts
+    with a resync from the beginning of the generation, as its snapshot.
+    Served asynchronously under ASGI, from a worker thread under WSGI.
+    """
+    session = _session(request.query_params.get('session'))
+    if isinstance(request._request, ASGIRequest):
+        content = events.stream_async(session)
     else:
-        # For large grids, use range-based approach for better performance
-        filled_positions = np.argwhere(state.CURRENT_IMAGE_NP == 1)
-        
-        if len(filled_positions) == 0:
-            return Response({
-                "image": [],
-                "m": state.GRID_M,
-                "n": state.GRID_N,
-                "colored_pixels": 0,
-                "total_pixels": total_pixels
-            })
-        
-        # Remove duplicate positions to ensure unique pixels
-        unique_positions = np.unique(filled_positions, axis=0)
-
-        # Get all filled indices at once using vectorized operations
-        y_coords = unique_positions[:, 0]
-        x_coords = unique_positions[:, 1]
-        color_indices = y_coords * state.GRID_N + x_coords
-
-        # Calculate colors using sequential RGB generation (guaranteed unique)
-        colors = np.zeros((len(color_indices), 3), dtype=np.uint8)
-
-        # Generate truly unique sequential colors
-        for i, idx in enumerate(color_indices):
-            # Use base-256 encoding to ensure uniqueness
-            colors[i] = [
-                (idx // (256 * 256)) % 256,  # Red component
-                (idx // 256) % 256,           # Green component  
-                idx % 256                     # Blue component
-            ]
-
-        # Build image list using list comprehension (faster than loop)
-        image_list = [
-            {"x": int(x), "y": int(y), "color": color.tolist()}
-            for x, y, color in zip(x_coords, y_coords, colors)
-        ]
+        content = events.stream(session)
 
-        return Response({
-            "image": image_list,
-            "m": state.GRID_M,
-            "n": state.GRID_N,
-            "colored_pixels": len(image_list),
-            "total_pixels": total_pixels,
-            "method": "sequential_unique_colors"
-        })
\ No newline at end of file
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@renderer_classes([PrometheusRenderer])
+def metrics_view(request: Request) -> Response:
+    """
+    Expose service metrics in the Prometheus text format.
+    """
+    return Response(metrics.render())
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import ping
+from .views import cancel, ping
 
 urlpatterns = [
     path('ping/', ping, name='ping'),
+    path('ping/cancel/', cancel, name='ping_cancel'),
 ]
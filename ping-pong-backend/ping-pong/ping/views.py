@@ -1,20 +1,55 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
 from rest_framework.response import Response
 from django.apps import apps
 
 from home.image_strategies.registry import get_image_strategy
+from home import transport
+from home.cancellation import CANCELLED
+from home.parsers import WireParser
 
 
-@api_view(['POST'])
-def ping(request: Request) -> Response:
+def hop(request: Request) -> Response:
+    """
+    Add the next pixels and forward the hop to pong; also called in process
+    by `home.transport`.
+    """
     data = request.data
+    # The run was cancelled or replaced: ack and end the chain here
+    if CANCELLED.drop(data.get('token')):
+        return Response({"status": "cancelled"})
 
     m = int(data.get('m', 0))
     n = int(data.get('n', 0))
     total_pixels = m * n
 
-    pong_url = f"{apps.get_app_config('home').MAIN_URL}/pong/"
+    pong_url = f"{apps.get_app_config('home').PONG_URL}/pong/"
     strategy = get_image_strategy(total_pixels)
 
     return strategy.handle(request, pong_url)
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, WireParser])
+def ping(request: Request) -> Response:
+    return hop(request)
+
+
+def cancel_run(request: Request) -> Response:
+    """
+    Cancel a run in this process, on notice from the main service: its hops
+    arriving here end their chain. Also called in process by `home.transport`.
+    """
+    CANCELLED.cancel(request.data.get('token'))
+    return Response({"status": "cancelled"})
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, WireParser])
+def cancel(request: Request) -> Response:
+    return cancel_run(request)
+
+
+transport.register(ping, hop)
+transport.register(cancel, cancel_run)
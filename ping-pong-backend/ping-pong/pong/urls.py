@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import pong    
+from .views import cancel, pong    
 
 urlpatterns = [
     path('pong/', pong, name='pong'),
+    path('pong/cancel/', cancel, name='pong_cancel'),
 ]
@@ -5,79 +5,113 @@ import StatusBar from "./components/StatusBar";
 import { validateUniqueColors } from "./utils/validateImage";
 import type { Pixel } from "./types";
  
+const API_URL = "http://localhost:8000/api";
 
 export default function App() {
   const [pixels, setPixels] = useState<Record<string, Pixel>>({});
   const [status, setStatus] = useState({ colored_pixels: 0, total_pixels: 0, done: false });
   const [dimensions, setDimensions] = useState({ m: 0, n: 0 });
+  const [session, setSession] = useState("");
   const [isLoading, setIsLoading] = useState(false);
   const [validationResult, setValidationResult] = useState<string | null>(null);
 
-  const fetchStatus = async () => {
-  try {
-    const res = await fetch(`http://localhost:8000/api/status/?m=${dimensions.m}&n=${dimensions.n}`);
-    const statusData = await res.json();
-    setStatus(statusData);
-    
-    const totalPixels = dimensions.m * dimensions.n;
-    
-    // Get image data from backend (no pagination)
-    const imgRes = await fetch(`http://localhost:8000/api/ui/?m=${dimensions.m}&n=${dimensions.n}`);
-    const data = await imgRes.json();
-    
-    // Convert image array to pixel dictionary
+  useEffect(() => {
+    if (!isLoading) return;
+
     const img: Record<string, Pixel> = {};
-    data.image.forEach((p: Pixel) => { 
-      img[`${p.x},${p.y}`] = p 
-    });
-    
-    setPixels(img);
-    
-    // Validate colors for all grid sizes
-    if (statusData.done && Object.keys(img).length > 0) {
+
+    // Sequential strategies derive each color from the linear index
+    const addRanges = (ranges: [number, number][]) => {
+      ranges.forEach(([start, end]) => {
+        for (let index = start; index < end; index++) {
+          const x = index % dimensions.n;
+          const y = Math.floor(index / dimensions.n);
+          img[`${x},${y}`] ??= { x, y, color: [(index >> 16) & 255, (index >> 8) & 255, index & 255] };
+        }
+      });
+    };
+
+    const addPixels = (data: { ranges: [number, number][]; image?: Pixel[]; reset?: boolean }) => {
+      // The cursor was from another generation: the response replays the current one
+      if (data.reset) {
+        Object.keys(img).forEach((key) => delete img[key]);
+      }
+      if (data.image && data.image.length > 0) {
+        data.image.forEach((p) => { img[`${p.x},${p.y}`] = p });
+      } else {
+        addRanges(data.ranges);
+      }
+      setPixels({ ...img });
+    };
+
+    const validate = () => {
+      if (Object.keys(img).length === 0) return;
       let pixelsToValidate = img;
       let sampleNote = "";
-      
+
       // For very large grids, validate a sample to avoid browser crashes
-      if (totalPixels > 100000) {
+      if (dimensions.m * dimensions.n > 100000) {
         const sampleSize = 10000;
-        const pixelEntries = Object.entries(img).slice(0, sampleSize);
-        pixelsToValidate = Object.fromEntries(pixelEntries);
+        pixelsToValidate = Object.fromEntries(Object.entries(img).slice(0, sampleSize));
         sampleNote = ` (sample of ${sampleSize}/${Object.keys(img).length} pixels)`;
-        console.log(`🔍 Validating sample: ${sampleSize} pixels out of ${totalPixels}`);
       }
-      
+
       const validation = validateUniqueColors(pixelsToValidate);
-      
       setValidationResult(
-        validation.isValid 
-          ? `✅ All pixels have unique colors${sampleNote}` 
+        validation.isValid
+          ? `✅ All pixels have unique colors${sampleNote}`
           : `❌ Found ${validation.duplicateColors.length} duplicate colors${sampleNote}`
       );
-    } else if (!statusData.done) {
-      setValidationResult(null); // Clear validation while in progress
-    }
-    
-  } catch (error) {
-    console.error("Failed to fetch status:", error);
-    setIsLoading(false);
-    setValidationResult("❌ Error fetching data");
-  }
-};
+    };
 
-  useEffect(() => {
-    if (isLoading && !status.done) {
-      console.log('🔄 Starting polling...');
-      fetchStatus();
-      const interval = setInterval(fetchStatus, 500);
-      return () => {
-        console.log('⏹️ Stopping polling...');
-        clearInterval(interval);
-      };
-    }
-  }, [isLoading, status.done, dimensions]);
+    console.log('🔄 Subscribing to progress events...');
+    const source = new EventSource(`${API_URL}/events/?session=${session}`);
+
+    source.addEventListener("pixels", (e) => addPixels(JSON.parse(e.data)));
+    source.addEventListener("progress", (e) => {
+      const progress = JSON.parse(e.data);
+      setStatus(progress);
+    });
+    // Sent first as the initial snapshot, then whenever we fell behind:
+    // fetch everything filled since the cursor the server resumes from
+    let resync: Promise<void> = Promise.resolve();
+    source.addEventListener("resync", (e) => {
+      const { cursor: since } = JSON.parse(e.data);
+      resync = resync
+        .then(() => fetch(`${API_URL}/ui/?session=${session}&since=${since}`))
+        .then((res) => res.json())
+        .then(addPixels);
+    });
+    source.addEventListener("done", () => {
+      source.close();
+      resync.finally(() => {
+        validate();
+        setIsLoading(false);
+      });
+    });
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        console.error("Progress stream closed");
+        setIsLoading(false);
+        setValidationResult("❌ Error fetching data");
+      }
+    };
+
+    return () => {
+      console.log('⏹️ Closing progress events...');
+      source.close();
+    };
+  }, [isLoading, dimensions, session]);
 
   const handleReset = () => {
+    // Stop the previous run instead of letting it compete with the new one
+    if (session) {
+      fetch(`${API_URL}/cancel/`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ session }),
+      }).catch(() => {});
+    }
     setPixels({});
     setStatus({ colored_pixels: 0, total_pixels: 0, done: false });
     setDimensions({ m: 0, n: 0 });
@@ -90,7 +124,7 @@ export default function App() {
         <h1 style={{ margin: '0 0 40px 0', textAlign: 'center' }}>Random Pixel Ping-Pong</h1>
         <div style={{ display: 'flex', flexDirection: 'row', gap: '20px', width: '100%', maxWidth: '1200px', justifyContent: 'center' }}>
           <div style={{ flex: 1, minWidth: '300px' }}>
-            <ConfigForm setIsLoading={setIsLoading} onReset={handleReset} setDimensions={setDimensions} />
+            <ConfigForm setIsLoading={setIsLoading} onReset={handleReset} setDimensions={setDimensions} setSession={setSession} />
             <StatusBar status={status} />
             {validationResult && (
               <div style={{
@@ -4,9 +4,10 @@ interface Props {
   setIsLoading: (isLoading: boolean) => void;
   onReset: () => void;
   setDimensions: (dimensions: { m: number; n: number }) => void;
+  setSession: (session: string) => void;
 }
 
-export default function ConfigForm({ setIsLoading, onReset, setDimensions }: Props) {
+export default function ConfigForm({ setIsLoading, onReset, setDimensions, setSession }: Props) {
   const [m, setM] = useState(5);
   const [n, setN] = useState(5);
 
@@ -15,22 +16,26 @@ export default function ConfigForm({ setIsLoading, onReset, setDimensions }: Pro
     const N = n > 0 ? n : 1;
     
     onReset();
-    setIsLoading(true);
     setDimensions({ m: M, n: N });
     
     try {
-      // Configure the grid
-      await fetch("http://localhost:8000/api/configure/", {
+      // Configure the grid: every run gets its own session on the server
+      const configured = await fetch("http://localhost:8000/api/configure/", {
         method: "POST", 
         headers: {"Content-Type":"application/json"}, 
         body: JSON.stringify({m: M, n: N})
       });
+      const { session } = await configured.json();
+      setSession(session);
+
+      // Subscribe to progress events once the new grid exists
+      setIsLoading(true);
       
       // Start generation with proper headers and body
       await fetch("http://localhost:8000/api/generate/", {
         method: "POST",
         headers: {"Content-Type": "application/json"},
-        body: JSON.stringify({m: M, n: N})
+        body: JSON.stringify({m: M, n: N, session})
       });
     } catch (error) {
       console.error("Failed to start generation:", error);